@@ -0,0 +1,579 @@
+"""
+Local stand-in for the GitHub REST API, backed by real bare git repositories
+"""
+
+import base64
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# The contents API stops returning bodies above this size
+CONTENTS_MAX_BYTES = 1024 * 1024
+
+
+class GitStore:
+    """A bare repository driven through git plumbing commands"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.git("init", "--quiet", "--bare", path, cwd=None)
+
+    def git(self, *args: str, cwd: Optional[str] = "", env=None, input=None) -> bytes:
+        command = ["git"] + (["-C", self.path] if cwd == "" else []) + list(args)
+        result = subprocess.run(
+            command,
+            input=input,
+            capture_output=True,
+            env={**os.environ, **(env or {})},
+        )
+        if result.returncode != 0:
+            raise LookupError(result.stderr.decode("utf-8", "replace").strip())
+        return result.stdout
+
+    def write_blob(self, data: bytes) -> str:
+        return self.git("hash-object", "-w", "--stdin", input=data).decode().strip()
+
+    def resolve(self, name: str, kind: Optional[str] = "commit") -> str:
+        """SHA of a revision, peeled to kind; "rev:path" names take kind=None"""
+        spec = f"{name}^{{{kind}}}" if kind else name
+        return self.git("rev-parse", "--verify", "--quiet", spec).decode().strip()
+
+    def write_tree(
+        self,
+        base_tree: Optional[str],
+        changes: Iterable[Tuple[str, str, Optional[str]]],
+    ) -> str:
+        """Apply (path, mode, sha) changes to base_tree; a None sha removes the path"""
+        with tempfile.TemporaryDirectory() as scratch:
+            env = {"GIT_INDEX_FILE": os.path.join(scratch, "index")}
+            if base_tree:
+                self.git("read-tree", base_tree, env=env)
+
+            additions, removals = [], []
+            for path, mode, sha in changes:
+                if sha is None:
+                    removals.append(path)
+                else:
+                    additions.append(f"{mode} {sha}\t{path}")
+
+            if additions:
+                self.git(
+                    "update-index",
+                    "--add",
+                    "--index-info",
+                    env=env,
+                    input="\n".join(additions).encode() + b"\n",
+                )
+            if removals:
+                self.git(
+                    "update-index",
+                    "--force-remove",
+                    "-z",
+                    "--stdin",
+                    env=env,
+                    input=b"\0".join(p.encode() for p in removals) + b"\0",
+                )
+            return self.git("write-tree", env=env).decode().strip()
+
+    def commit(self, tree: str, parents: List[str], message: str) -> str:
+        args = ["commit-tree", tree, "-m", message]
+        for parent in parents:
+            args += ["-p", parent]
+        env = {
+            "GIT_AUTHOR_NAME": "bench",
+            "GIT_AUTHOR_EMAIL": "bench@example.com",
+            "GIT_COMMITTER_NAME": "bench",
+            "GIT_COMMITTER_EMAIL": "bench@example.com",
+        }
+        return self.git(*args, env=env).decode().strip()
+
+    def update_ref(self, ref: str, sha: str) -> None:
+        self.git("update-ref", ref, sha)
+
+    def commit_files(
+        self, branch: str, files: Dict[str, Optional[bytes]], message: str
+    ) -> str:
+        """Commit added, changed (bytes) and removed (None) files onto a branch"""
+        try:
+            parent = self.resolve(f"refs/heads/{branch}")
+        except LookupError:
+            parent = None
+
+        changes = []
+        for path, data in files.items():
+            changes.append(
+                (path, "100644", None if data is None else self.write_blob(data))
+            )
+
+        base_tree = self.resolve(parent, "tree") if parent else None
+        tree = self.write_tree(base_tree, changes)
+        sha = self.commit(tree, [parent] if parent else [], message)
+        self.update_ref(f"refs/heads/{branch}", sha)
+        return sha
+
+    def ls_tree(self, tree_ish: str, recursive: bool) -> List[Dict]:
+        args = ["ls-tree", "-l", "-z"] + (["-r"] if recursive else []) + [tree_ish]
+        entries = []
+        for record in self.git(*args).split(b"\0"):
+            if not record:
+                continue
+            meta, path = record.decode().split("\t", 1)
+            mode, kind, sha, size = meta.split()
+            entry = {"path": path, "mode": mode, "type": kind, "sha": sha}
+            if kind == "blob":
+                entry["size"] = int(size)
+            entries.append(entry)
+        return entries
+
+    def read_blob(self, sha: str) -> bytes:
+        return self.git("cat-file", "blob", sha)
+
+    def commit_info(self, sha: str) -> Tuple[str, List[str], str]:
+        raw = self.git("cat-file", "commit", sha).decode()
+        header, _, message = raw.partition("\n\n")
+        tree, parents = "", []
+        for line in header.split("\n"):
+            key, _, value = line.partition(" ")
+            if key == "tree":
+                tree = value
+            elif key == "parent":
+                parents.append(value)
+        return tree, parents, message
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        try:
+            self.git("merge-base", "--is-ancestor", ancestor, descendant)
+            return True
+        except LookupError:
+            return False
+
+    def changed_paths(self, base: str, head: str) -> List[Tuple[str, str]]:
+        statuses = {"A": "added", "M": "modified", "D": "removed"}
+        changes = []
+        output = self.git("diff", "--name-status", "--no-renames", "-z", base, head)
+        fields = output.split(b"\0")
+        for status, path in zip(fields[0::2], fields[1::2]):
+            if status:
+                changes.append(
+                    (statuses.get(status.decode()[0], "modified"), path.decode())
+                )
+        return changes
+
+    def archive(self, sha: str, prefix: str) -> bytes:
+        return self.git("archive", "--format=tar.gz", f"--prefix={prefix}/", sha)
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """Serves the endpoints IntelliDocs uses and counts every request
+
+    Rate limit headers advertise rate_limit requests per hour so the
+    client-side pacing behaves as it would against a real installation.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root: str, rate_limit: int = 1000000):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.root = root
+        self.rate_limit = rate_limit
+        self.repos: Dict[str, GitStore] = {}
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self.requests = 0
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def add_repo(self, full_name: str) -> GitStore:
+        path = os.path.join(self.root, full_name.replace("/", "__") + ".git")
+        self.repos[full_name] = GitStore(path)
+        return self.repos[full_name]
+
+    def start(self) -> "FakeGitHub":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def record(self, endpoint: str, size: int) -> None:
+        with self._stats_lock:
+            self.calls[endpoint] += 1
+            self.requests += 1
+            self.bytes_sent += size
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "calls": dict(self.calls),
+            }
+
+
+_REPO = r"/repos/(?P<repo>[^/]+/[^/]+)"
+
+# (method, pattern, handler name, endpoint label)
+_ROUTES = [
+    (
+        "POST",
+        r"/app/installations/(?P<id>\d+)/access_tokens",
+        "access_token",
+        "POST /app/installations/{id}/access_tokens",
+    ),
+    ("GET", _REPO + r"$", "get_repo", "GET /repos/{repo}"),
+    (
+        "GET",
+        _REPO + r"/branches/(?P<branch>.+)",
+        "get_branch",
+        "GET /repos/{repo}/branches/{branch}",
+    ),
+    (
+        "GET",
+        _REPO + r"/git/refs/(?P<ref>.+)",
+        "get_ref",
+        "GET /repos/{repo}/git/refs/{ref}",
+    ),
+    (
+        "PATCH",
+        _REPO + r"/git/refs/(?P<ref>.+)",
+        "update_ref",
+        "PATCH /repos/{repo}/git/refs/{ref}",
+    ),
+    ("POST", _REPO + r"/git/refs$", "create_ref", "POST /repos/{repo}/git/refs"),
+    (
+        "GET",
+        _REPO + r"/git/commits/(?P<sha>\w+)",
+        "get_git_commit",
+        "GET /repos/{repo}/git/commits/{sha}",
+    ),
+    (
+        "POST",
+        _REPO + r"/git/commits$",
+        "create_commit",
+        "POST /repos/{repo}/git/commits",
+    ),
+    (
+        "GET",
+        _REPO + r"/git/trees/(?P<tree>.+)",
+        "get_tree",
+        "GET /repos/{repo}/git/trees/{sha}",
+    ),
+    ("POST", _REPO + r"/git/trees$", "create_tree", "POST /repos/{repo}/git/trees"),
+    (
+        "GET",
+        _REPO + r"/git/blobs/(?P<sha>\w+)",
+        "get_blob",
+        "GET /repos/{repo}/git/blobs/{sha}",
+    ),
+    (
+        "GET",
+        _REPO + r"/contents/(?P<path>.+)",
+        "get_contents",
+        "GET /repos/{repo}/contents/{path}",
+    ),
+    (
+        "GET",
+        _REPO + r"/tarball/(?P<ref>.+)",
+        "get_tarball_link",
+        "GET /repos/{repo}/tarball/{ref}",
+    ),
+    (
+        "GET",
+        r"/_archives/(?P<repo>[^/]+/[^/]+)/(?P<sha>\w+)\.tar\.gz",
+        "get_archive",
+        "GET codeload tarball",
+    ),
+    (
+        "GET",
+        _REPO + r"/commits/(?P<sha>\w+)$",
+        "get_commit",
+        "GET /repos/{repo}/commits/{sha}",
+    ),
+    (
+        "POST",
+        _REPO + r"/statuses/(?P<sha>\w+)",
+        "create_status",
+        "POST /repos/{repo}/statuses/{sha}",
+    ),
+    (
+        "GET",
+        _REPO + r"/compare/(?P<base>\w+)\.\.\.(?P<head>\w+)",
+        "compare",
+        "GET /repos/{repo}/compare/{base}...{head}",
+    ),
+]
+_COMPILED_ROUTES = [
+    (method, re.compile(pattern + r"/?$"), handler, label)
+    for method, pattern, handler, label in _ROUTES
+]
+
+
+class _NotFound(Exception):
+    pass
+
+
+class _Unprocessable(Exception):
+    pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeGitHub
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def _dispatch(self, method: str) -> None:
+        parts = urlsplit(self.path)
+        self.query = parse_qs(parts.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = json.loads(self.rfile.read(length) or b"null") if length else None
+
+        for route_method, pattern, handler, label in _COMPILED_ROUTES:
+            match = pattern.match(parts.path)
+            if route_method != method or not match:
+                continue
+            params = {key: unquote(value) for key, value in match.groupdict().items()}
+            try:
+                if "repo" in params and params["repo"] not in self.server.repos:
+                    raise _NotFound()
+                result = getattr(self, handler)(**params)
+            except (_NotFound, LookupError):
+                result = (404, {"message": "Not Found"})
+            except _Unprocessable as e:
+                result = (422, {"message": str(e)})
+            self._respond(label, *result)
+            return
+
+        self._respond(f"{method} (unrouted)", 404, {"message": "Not Found"})
+
+    def _respond(self, label, status, payload, headers=None, raw: bytes = None):
+        body = raw if raw is not None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header(
+            "Content-Type", "application/json" if raw is None else "application/gzip"
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Limit", str(self.server.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(self.server.rate_limit - 1))
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+        self.send_header("X-RateLimit-Resource", "core")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record(label, len(body))
+
+    # Helpers
+
+    def _store(self, repo: str) -> GitStore:
+        return self.server.repos[repo]
+
+    def _api(self, repo: str, suffix: str = "") -> str:
+        return f"{self.server.url}/repos/{repo}{suffix}"
+
+    def _git_commit_json(self, repo: str, sha: str) -> Dict:
+        tree, parents, message = self._store(repo).commit_info(sha)
+        return {
+            "sha": sha,
+            "url": self._api(repo, f"/git/commits/{sha}"),
+            "message": message,
+            "tree": {"sha": tree, "url": self._api(repo, f"/git/trees/{tree}")},
+            "parents": [
+                {"sha": parent, "url": self._api(repo, f"/git/commits/{parent}")}
+                for parent in parents
+            ],
+        }
+
+    def _ref_json(self, repo: str, ref: str, sha: str) -> Dict:
+        return {
+            "ref": f"refs/{ref}",
+            "url": self._api(repo, f"/git/refs/{ref}"),
+            "object": {
+                "sha": sha,
+                "type": "commit",
+                "url": self._api(repo, f"/git/commits/{sha}"),
+            },
+        }
+
+    # Endpoints
+
+    def access_token(self, id):
+        return 201, {"token": f"ghs_bench_{id}", "expires_at": "2099-01-01T00:00:00Z"}
+
+    def get_repo(self, repo):
+        owner, name = repo.split("/")
+        return 200, {
+            "id": abs(hash(repo)) % 100000,
+            "name": name,
+            "full_name": repo,
+            "owner": {"login": owner},
+            "private": False,
+            "default_branch": "main",
+            "url": self._api(repo),
+            "clone_url": f"file://{self._store(repo).path}",
+        }
+
+    def get_branch(self, repo, branch):
+        sha = self._store(repo).resolve(f"refs/heads/{branch}")
+        return 200, {
+            "name": branch,
+            "commit": {"sha": sha, "url": self._api(repo, f"/commits/{sha}")},
+        }
+
+    def get_ref(self, repo, ref):
+        sha = self._store(repo).resolve(f"refs/{ref}")
+        return 200, self._ref_json(repo, ref, sha)
+
+    def update_ref(self, repo, ref):
+        store = self._store(repo)
+        current = store.resolve(f"refs/{ref}")
+        new = self.body["sha"]
+        if not self.body.get("force") and not store.is_ancestor(current, new):
+            raise _Unprocessable("Update is not a fast forward")
+        store.git("update-ref", f"refs/{ref}", new, current)
+        return 200, self._ref_json(repo, ref, new)
+
+    def create_ref(self, repo):
+        store = self._store(repo)
+        ref = self.body["ref"]
+        try:
+            store.resolve(ref)
+            raise _Unprocessable("Reference already exists")
+        except LookupError:
+            pass
+        store.update_ref(ref, self.body["sha"])
+        return 201, self._ref_json(repo, ref[len("refs/") :], self.body["sha"])
+
+    def get_git_commit(self, repo, sha):
+        return 200, self._git_commit_json(repo, sha)
+
+    def create_commit(self, repo):
+        sha = self._store(repo).commit(
+            self.body["tree"], self.body.get("parents", []), self.body["message"]
+        )
+        return 201, self._git_commit_json(repo, sha)
+
+    def get_tree(self, repo, tree):
+        store = self._store(repo)
+        sha = store.resolve(tree, "tree")
+        recursive = bool(self.query.get("recursive"))
+        entries = store.ls_tree(sha, recursive)
+        for entry in entries:
+            kind = "blobs" if entry["type"] == "blob" else "trees"
+            entry["url"] = self._api(repo, f"/git/{kind}/{entry['sha']}")
+        return 200, {
+            "sha": sha,
+            "url": self._api(repo, f"/git/trees/{sha}"),
+            "tree": entries,
+            "truncated": False,
+        }
+
+    def create_tree(self, repo):
+        store = self._store(repo)
+        changes = []
+        for element in self.body["tree"]:
+            if "content" in element:
+                sha = store.write_blob(element["content"].encode("utf-8"))
+            else:
+                sha = element.get("sha")
+            changes.append((element["path"], element["mode"], sha))
+        sha = store.write_tree(self.body.get("base_tree"), changes)
+        return 201, {
+            "sha": sha,
+            "url": self._api(repo, f"/git/trees/{sha}"),
+            "tree": [],
+            "truncated": False,
+        }
+
+    def get_blob(self, repo, sha):
+        data = self._store(repo).read_blob(sha)
+        return 200, {
+            "sha": sha,
+            "size": len(data),
+            "encoding": "base64",
+            "content": base64.b64encode(data).decode(),
+            "url": self._api(repo, f"/git/blobs/{sha}"),
+        }
+
+    def get_contents(self, repo, path):
+        store = self._store(repo)
+        ref = self.query.get("ref", ["main"])[0]
+        sha = store.resolve(f"{ref}:{path}", None)
+        data = store.read_blob(sha)
+        too_large = len(data) > CONTENTS_MAX_BYTES
+        return 200, {
+            "type": "file",
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "sha": sha,
+            "size": len(data),
+            "encoding": "none" if too_large else "base64",
+            "content": "" if too_large else base64.b64encode(data).decode(),
+            "url": self._api(repo, f"/contents/{path}"),
+        }
+
+    def get_tarball_link(self, repo, ref):
+        sha = self._store(repo).resolve(ref)
+        location = f"{self.server.url}/_archives/{repo}/{sha}.tar.gz"
+        return 302, {}, {"Location": location}
+
+    def get_archive(self, repo, sha):
+        owner, name = repo.split("/")
+        data = self._store(repo).archive(sha, f"{owner}-{name}-{sha[:7]}")
+        return 200, None, None, data
+
+    def get_commit(self, repo, sha):
+        sha = self._store(repo).resolve(sha)
+        return 200, {
+            "sha": sha,
+            "url": self._api(repo, f"/commits/{sha}"),
+            "commit": {"message": self._store(repo).commit_info(sha)[2]},
+            "files": [],
+        }
+
+    def create_status(self, repo, sha):
+        return 201, {
+            "state": self.body.get("state"),
+            "context": self.body.get("context"),
+        }
+
+    def compare(self, repo, base, head):
+        files = [
+            {"filename": path, "status": status, "sha": ""}
+            for status, path in self._store(repo).changed_paths(base, head)
+        ]
+        return 200, {
+            "url": self._api(repo, f"/compare/{base}...{head}"),
+            "status": "ahead",
+            "ahead_by": 1,
+            "behind_by": 0,
+            "total_commits": 1,
+            "commits": [],
+            "files": files,
+        }
@@ -0,0 +1,50 @@
+"""
+Stand-in for the Gemini model with a fixed response latency
+"""
+
+import hashlib
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Answers every prompt after latency seconds and counts what it was sent
+
+    Responses depend only on the prompt, like a deterministic model, so the
+    response cache behaves as it would in production.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.prompt_bytes = 0
+        self.max_prompt_bytes = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        size = len(prompt.encode("utf-8"))
+        with self._lock:
+            self.calls += 1
+            self.prompt_bytes += size
+            self.max_prompt_bytes = max(self.max_prompt_bytes, size)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+        return FakeResponse(
+            f"# Generated documentation\n\nWritten from a {size}-byte prompt ({digest}).\n"
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_bytes": self.prompt_bytes,
+                "max_prompt_bytes": self.max_prompt_bytes,
+            }
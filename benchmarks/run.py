@@ -0,0 +1,281 @@
+"""
+End-to-end IntelliDocs benchmark against local GitHub and Gemini stand-ins
+
+    python -m benchmarks.run --files 200 --modules 8 --file-bytes 4000 \\
+        --changed 5 --llm-latency 0.05 --output bench.json
+
+Each scenario runs an initial push (no docs branch yet) followed by an
+incremental push that changes --changed files. The results are printed as
+JSON; pass --baseline with an earlier output to exit non-zero when a metric
+grows by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.fake_llm import FakeGeminiModel
+from benchmarks.synthetic_repo import build_repo, mutate_repo
+
+INSTALLATION_ID = 4242
+SCENARIOS = ("process_push_event", "handle_push")
+# Metrics compared against a baseline; all of them are better when lower
+COMPARED_METRICS = ("wall_seconds", "github_requests", "llm_calls", "llm_prompt_bytes")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--modules", type=int, default=5)
+    parser.add_argument("--file-bytes", type=int, default=3000)
+    parser.add_argument("--changed", type=int, default=3)
+    parser.add_argument(
+        "--junk-files", type=int, default=0, help="Vendored/generated files to add"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=1000000)
+    parser.add_argument("--strategy", default="direct")
+    parser.add_argument("--source-backend", default="mirror")
+    parser.add_argument(
+        "--pipeline", choices=("streaming", "batch"), default="streaming"
+    )
+    parser.add_argument("--no-llm-cache", action="store_true")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument("--output", help="Also write the JSON results here")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="Show app logs")
+    return parser.parse_args(argv)
+
+
+def _write_private_key(path: str) -> None:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(path, "wb") as key_file:
+        key_file.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+
+
+def _configure_environment(args, workdir: str, api_url: str) -> None:
+    # Must happen before any src module is imported; several read settings
+    # at import time
+    key_path = os.path.join(workdir, "app.pem")
+    _write_private_key(key_path)
+    os.environ.update(
+        {
+            "GITHUB_API_URL": api_url,
+            "GITHUB_APP_ID": "1",
+            "GITHUB_PRIVATE_KEY_PATH": key_path,
+            "GEMINI_API_KEY": "benchmark",
+            "INTELLIDOCS_DATA_DIR": os.path.join(workdir, "data"),
+            "LLM_CACHE_ENABLED": "false" if args.no_llm_cache else "true",
+            "DOCS_STRATEGY": args.strategy,
+            "SOURCE_BACKEND": args.source_backend,
+            "DOCS_PIPELINE": args.pipeline,
+        }
+    )
+
+
+def _push_event(repo_name: str, before: str, after: str, changes=None) -> dict:
+    changes = changes or {}
+    return {
+        "ref": "refs/heads/main",
+        "before": before,
+        "after": after,
+        "repository": {"full_name": repo_name, "name": repo_name.split("/")[1]},
+        "installation": {"id": INSTALLATION_ID},
+        "commits": [
+            {
+                "message": "benchmark push",
+                "added": [],
+                "modified": [p for p, data in changes.items() if data is not None],
+                "removed": [p for p, data in changes.items() if data is None],
+            }
+        ],
+    }
+
+
+def _measure(scenario, phase, server, llm, log, run) -> dict:
+    github_before = server.stats()
+    llm_before = llm.stats()
+    error = None
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        try:
+            run()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+
+    github_after = server.stats()
+    llm_after = llm.stats()
+    calls = Counter(github_after["calls"])
+    calls.subtract(github_before["calls"])
+
+    return {
+        "scenario": scenario,
+        "phase": phase,
+        "wall_seconds": round(elapsed, 4),
+        "github_requests": github_after["requests"] - github_before["requests"],
+        "github_bytes": github_after["bytes_sent"] - github_before["bytes_sent"],
+        "github_calls": {k: v for k, v in sorted(calls.items()) if v},
+        "llm_calls": llm_after["calls"] - llm_before["calls"],
+        "llm_prompt_bytes": llm_after["prompt_bytes"] - llm_before["prompt_bytes"],
+        "llm_max_prompt_bytes": llm_after["max_prompt_bytes"],
+        # Peak for the whole process so far (Linux reports kilobytes)
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "error": error,
+    }
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="intellidocs-bench-")
+    server = FakeGitHub(os.path.join(workdir, "github"), rate_limit=args.rate_limit)
+    os.makedirs(server.root, exist_ok=True)
+    server.start()
+
+    try:
+        _configure_environment(args, workdir, server.url)
+
+        import main
+        import src.docs_generator
+        from src.webhook import WebhookHandler
+
+        llm = FakeGeminiModel(args.llm_latency)
+        src.docs_generator._gemini_model = llm
+
+        tree = build_repo(
+            args.files, args.modules, args.file_bytes, junk=args.junk_files
+        )
+        changes = mutate_repo(tree, args.changed)
+        log = (
+            sys.stderr if args.verbose else open(os.path.join(workdir, "app.log"), "w")
+        )
+
+        results = []
+        for scenario in args.scenario or SCENARIOS:
+            repo_name = f"bench/{scenario.replace('_', '-')}"
+            store = server.add_repo(repo_name)
+            first = store.commit_files("main", tree, "Initial commit")
+            second_changes = dict(changes)
+
+            if scenario == "process_push_event":
+
+                def push(event):
+                    return lambda: asyncio.run(main.process_push_event(event))
+
+            else:
+                handler = WebhookHandler()
+
+                def push(event):
+                    return lambda: asyncio.run(handler.handle_push(event))
+
+            zero = "0" * 40
+            results.append(
+                _measure(
+                    scenario,
+                    "initial",
+                    server,
+                    llm,
+                    log,
+                    push(_push_event(repo_name, zero, first)),
+                )
+            )
+
+            second = store.commit_files("main", second_changes, "Incremental change")
+            results.append(
+                _measure(
+                    scenario,
+                    "incremental",
+                    server,
+                    llm,
+                    log,
+                    push(_push_event(repo_name, first, second, second_changes)),
+                )
+            )
+
+        return {
+            "config": {
+                "files": args.files,
+                "modules": args.modules,
+                "file_bytes": args.file_bytes,
+                "repo_bytes": sum(len(data) for data in tree.values()),
+                "changed": args.changed,
+                "junk_files": args.junk_files,
+                "llm_latency": args.llm_latency,
+                "strategy": args.strategy,
+                "source_backend": args.source_backend,
+                "pipeline": args.pipeline,
+                "llm_cache": not args.no_llm_cache,
+            },
+            "results": results,
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Metrics that grew by more than tolerance since the baseline"""
+    previous = {(r["scenario"], r["phase"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["scenario"], result["phase"]))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(
+                    {
+                        "scenario": result["scenario"],
+                        "phase": result["phase"],
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                    }
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            report["regressions"] = compare(
+                report, json.load(baseline_file), args.tolerance
+            )
+        status = 1 if report["regressions"] else 0
+    if any(result["error"] for result in report["results"]):
+        status = 1
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
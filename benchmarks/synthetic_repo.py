@@ -0,0 +1,111 @@
+"""
+Deterministic synthetic source trees of a configurable size
+"""
+
+import random
+from typing import Dict, List, Optional
+
+_EXTENSIONS = [".py", ".py", ".py", ".js", ".ts", ".go"]
+
+
+def _python_file(rng: random.Random, module: str, index: int, size: int) -> str:
+    lines = [f'"""Synthetic {module} component {index}"""', "", "import os", ""]
+    n = 0
+    while sum(len(line) + 1 for line in lines) < size:
+        n += 1
+        lines += [
+            "",
+            f"class {module.title()}Worker{index}_{n}:",
+            f'    """Handles batch {n} of the {module} pipeline"""',
+            "",
+            f"    def run(self, items, limit={rng.randint(1, 100)}):",
+            "        total = 0",
+            "        for item in items[:limit]:",
+            f"            total += len(str(item)) * {rng.randint(2, 9)}",
+            "        return total",
+            "",
+            f"def helper_{n}(value):",
+            f"    return value + {rng.randint(1, 1000)}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _brace_file(
+    rng: random.Random, ext: str, module: str, index: int, size: int
+) -> str:
+    if ext == ".go":
+        lines = [f"package {module}", "", 'import "fmt"', ""]
+        template = (
+            "func Step{n}(x int) int {{\n\tfmt.Println(x)\n\treturn x + {k}\n}}\n"
+        )
+    else:
+        lines = [f"import {{ util }} from './util';", ""]
+        template = "export function step{n}(x) {{\n  return util(x) + {k};\n}}\n"
+    n = 0
+    while sum(len(line) + 1 for line in lines) < size:
+        n += 1
+        lines.append(template.format(n=n, k=rng.randint(1, 1000)))
+    return "\n".join(lines)
+
+
+# Where vendored, generated, minified and lock files typically live
+_JUNK_PATHS = [
+    "node_modules/left-pad/index{n}.js",
+    "vendor/lib{n}/lib.go",
+    "dist/app{n}.min.js",
+    "api/service{n}_pb2.py",
+    "junk{n}/package-lock.json",
+]
+
+
+def build_repo(
+    files: int, modules: int, file_bytes: int, seed: int = 0, junk: int = 0
+) -> Dict[str, bytes]:
+    """files source files spread over modules directories, about file_bytes
+    each, plus junk files that should never be documented"""
+    rng = random.Random(seed)
+    tree = {"README.md": b"# Synthetic benchmark repository\n"}
+    module_names = [f"mod{m}" for m in range(max(modules, 1))]
+
+    for index in range(files):
+        module = module_names[index % len(module_names)]
+        ext = _EXTENSIONS[index % len(_EXTENSIONS)]
+        path = f"{module}/file{index}{ext}"
+        if index == 0:
+            path = "main.py"
+            ext = ".py"
+
+        if ext == ".py":
+            content = _python_file(rng, module, index, file_bytes)
+        else:
+            content = _brace_file(rng, ext, module, index, file_bytes)
+        tree[path] = content.encode("utf-8")
+
+    for index in range(junk):
+        path = _JUNK_PATHS[index % len(_JUNK_PATHS)].format(n=index)
+        content = _brace_file(rng, ".js", "junk", index, file_bytes * 4)
+        tree[path] = content.encode("utf-8")
+
+    return tree
+
+
+def mutate_repo(
+    tree: Dict[str, bytes], changed: int, seed: int = 1
+) -> Dict[str, Optional[bytes]]:
+    """Changes for an incremental push: changed files get a new function"""
+    rng = random.Random(seed)
+    sources: List[str] = sorted(
+        path for path in tree if path.startswith(("main.py", "mod"))
+    )
+    picked = rng.sample(sources, min(changed, len(sources)))
+
+    changes = {}
+    for path in picked:
+        if path.endswith(".py"):
+            extra = f"\n\ndef patched_{seed}(value):\n    return value * {rng.randint(2, 9)}\n"
+        elif path.endswith(".go"):
+            extra = f"\nfunc Patched{seed}(x int) int {{\n\treturn x * 2\n}}\n"
+        else:
+            extra = f"\nexport function patched{seed}(x) {{\n  return x * 2;\n}}\n"
+        changes[path] = tree[path] + extra.encode("utf-8")
+    return changes
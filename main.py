@@ -1,19 +1,103 @@
 import os
 import hmac
 import hashlib
-import json
-from urllib.parse import unquote
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
+import time
+from fastapi import FastAPI, Request, HTTPException, Response
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from src.auth import GitHubAppAuth
+# Loaded before the src imports, some of which read settings at import time
+load_dotenv()
+
+from src.auth import get_github_auth
 from src.git_operations import GitOperations
+from src.content_store import ContentStore
+from src.delivery_dedup import DeliveryDeduplicator
 from src.docs_generator import DocsGenerator
+from src.file_filter import (
+    FILTER_CONFIG_FILES,
+    FileFilter,
+    fetch_file_filter,
+    load_file_filter,
+    looks_binary,
+)
+from src.job_queue import JobQueue, WorkerPool
+from src.manifest import DocsManifest
+from src.metrics import (
+    IN_FLIGHT_JOBS,
+    QUEUE_DEPTH,
+    WEBHOOK_ACK_SECONDS,
+    stage_timer,
+)
+from src.mirror_cache import get_mirror_cache
+from src.push_events import (
+    TRACKED_REFS,
+    compact_push_event,
+    merge_push_events,
+    parse_webhook_body,
+)
+from src.rate_limit import rate_limit_stats
+from src.pipeline import DocsPipeline
+from src.snapshot import iter_snapshot_text
+from src.storage import data_path
+from src.tracing import start_trace
+from src.tree_index import TreeIndex
+
+# GitHub caps webhook payloads at 25 MB
+MAX_WEBHOOK_BYTES = int(os.getenv("MAX_WEBHOOK_BYTES", str(25 * 1024 * 1024)))
+
+# Pushes arriving within this window of each other share one docs run
+PUSH_DEBOUNCE_SECONDS = float(os.getenv("PUSH_DEBOUNCE_SECONDS", "5"))
+PUSH_DEBOUNCE_MAX_SECONDS = float(os.getenv("PUSH_DEBOUNCE_MAX_SECONDS", "60"))
+
+# Where source is read from: "mirror" (local bare clone) or "snapshot" (tarball)
+SOURCE_BACKEND = os.getenv("SOURCE_BACKEND", "mirror").lower()
+
+# "streaming" overlaps fetching, generation and commit reads; "batch" runs them
+# one after another
+DOCS_PIPELINE = os.getenv("DOCS_PIPELINE", "streaming").lower()
 
-load_dotenv()
 
 app = FastAPI(title="IntelliDocs GitHub App", version="1.0.0")
 
+job_queue = None
+worker_pool = None
+delivery_dedup = None
+
+
+@app.on_event("startup")
+async def start_workers():
+    global job_queue, worker_pool, delivery_dedup
+
+    delivery_dedup = DeliveryDeduplicator(
+        data_path("deliveries.log"),
+        ttl=float(os.getenv("DELIVERY_DEDUP_TTL", str(3 * 24 * 3600))),
+        max_entries=int(os.getenv("DELIVERY_DEDUP_MAX_ENTRIES", "100000")),
+    )
+
+    job_queue = JobQueue(
+        os.getenv("JOB_QUEUE_PATH") or data_path("jobs.sqlite3"),
+        visibility_timeout=float(os.getenv("JOB_VISIBILITY_TIMEOUT", "1800")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+        retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "30")),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+    )
+    worker_pool = WorkerPool(
+        job_queue, process_push_event, workers=int(os.getenv("WORKER_COUNT", "2"))
+    )
+    QUEUE_DEPTH.set_function(job_queue.depth)
+    IN_FLIGHT_JOBS.set_function(lambda: worker_pool.in_flight)
+
+    # Jobs left over from a previous run are picked up straight away
+    print(f"📥 Job queue ready with {job_queue.depth()} pending jobs")
+    worker_pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    if worker_pool:
+        worker_pool.stop()
+
 
 @app.get("/")
 async def root():
@@ -25,14 +109,36 @@ async def health():
     return {"status": "healthy", "version": "1.0.0"}
 
 
-@app.post("/webhook")
-async def webhook(request: Request, background_tasks: BackgroundTasks):
-    payload = await request.body()
-    signature = request.headers.get("X-Hub-Signature-256")
+@app.get("/rate-limits")
+async def rate_limits():
+    """Remaining GitHub API budget per installation"""
+    return rate_limit_stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for the webhook, job pipeline and its backends"""
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
 
-    print(f"📨 Webhook received!")
-    print(f"📝 Signature: {signature}")
 
+@app.post("/webhook")
+async def webhook(request: Request):
+    started = time.perf_counter()
+    status = 200
+    try:
+        return await receive_webhook(request)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except Exception:
+        status = 500
+        raise
+    finally:
+        WEBHOOK_ACK_SECONDS.labels(str(status)).observe(time.perf_counter() - started)
+
+
+async def receive_webhook(request: Request):
+    signature = request.headers.get("X-Hub-Signature-256")
     if not signature:
         print("❌ Missing signature")
         raise HTTPException(status_code=400, detail="Missing signature")
@@ -42,84 +148,183 @@ async def webhook(request: Request, background_tasks: BackgroundTasks):
         print("❌ Webhook secret not configured")
         raise HTTPException(status_code=500, detail="Webhook secret not configured")
 
-    expected_signature = (
-        "sha256="
-        + hmac.new(webhook_secret.encode(), payload, hashlib.sha256).hexdigest()
-    )
-
-    if not hmac.compare_digest(signature, expected_signature):
+    # Reject oversize bodies before reading them when the client says how big they are
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > MAX_WEBHOOK_BYTES:
+            print(f"❌ Payload too large: {content_length} bytes")
+            raise HTTPException(status_code=413, detail="Payload too large")
+
+    # Read the body once, verifying the signature as it streams in
+    digest = hmac.new(webhook_secret.encode(), digestmod=hashlib.sha256)
+    payload = bytearray()
+    async for chunk in request.stream():
+        payload += chunk
+        if len(payload) > MAX_WEBHOOK_BYTES:
+            print("❌ Payload too large")
+            raise HTTPException(status_code=413, detail="Payload too large")
+        digest.update(chunk)
+
+    if not hmac.compare_digest(signature, "sha256=" + digest.hexdigest()):
         print("❌ Invalid signature")
         raise HTTPException(status_code=401, detail="Invalid signature")
 
-    print("✅ Signature verified!")
+    # GitHub redelivers on timeouts and manual redelivery; each copy has the same ID
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    if delivery_id and delivery_dedup.is_duplicate(delivery_id):
+        print(
+            f"⏭️  Duplicate delivery {delivery_id} ignored "
+            f"({delivery_dedup.duplicates} dropped so far)"
+        )
+        return {"message": "Duplicate delivery ignored"}
 
-    print(f"📦 Payload length: {len(payload)}")
     if len(payload) == 0:
         print("❌ Empty payload received")
         raise HTTPException(status_code=400, detail="Empty payload")
 
-    try:
-        # GitHub sends webhook data as form-encoded payload
-        payload_str = payload.decode("utf-8")
-
-        if payload_str.startswith("payload="):
-            # Extract and URL-decode the JSON payload
-            json_payload = unquote(payload_str[8:])  # Remove 'payload=' prefix
-            event_data = json.loads(json_payload)
-            print("📋 Parsed form-encoded webhook payload")
-        else:
-            # Try direct JSON parsing (for other webhook formats)
-            event_data = json.loads(payload_str)
-            print("📋 Parsed direct JSON payload")
+    # Only push events are processed, so skip parsing everything else
+    event_type = request.headers.get("X-GitHub-Event")
+    if event_type != "push":
+        return {
+            "message": f"Event '{event_type}' received but ignored (not a push event)"
+        }
 
-    except json.JSONDecodeError as e:
+    try:
+        event_data = compact_push_event(parse_webhook_body(bytes(payload)))
+    except ValueError as e:
         print(f"❌ JSON decode error: {e}")
-        print(f"📄 Raw payload preview: {payload[:200]}")
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
     except Exception as e:
         print(f"❌ Payload parsing error: {e}")
-        print(f"📄 Raw payload preview: {payload[:200]}")
         raise HTTPException(status_code=400, detail="Failed to parse payload")
 
-    event_type = request.headers.get("X-GitHub-Event")
-    print(f"📋 Event type: {event_type}")
+    if event_data["ref"] not in TRACKED_REFS:
+        return {"message": "Push event ignored (not main/master branch)"}
+
+    # Carried with the job so its trace can be matched to the delivery
+    event_data["delivery_ids"] = [delivery_id] if delivery_id else []
+
+    job_id = job_queue.enqueue(
+        "push",
+        event_data,
+        delay=PUSH_DEBOUNCE_SECONDS,
+        coalesce_key=event_data["repository"]["full_name"],
+        merge=merge_push_events,
+        max_delay=PUSH_DEBOUNCE_MAX_SECONDS,
+    )
+    print(f"📥 Queued push to {event_data['repository']['full_name']} as job {job_id}")
+    if delivery_id:
+        delivery_dedup.record(delivery_id)
+    return {"message": "Push event received and queued for processing"}
+
+
+def iter_code_files(repo, ref, code_files):
+    """Fetch file contents one request at a time"""
+    for file_path in code_files:
+        try:
+            print(f"📖 Processing: {file_path}")
 
-    if event_type == "push":
-        print("🚀 Processing push event...")
-        background_tasks.add_task(process_push_event, event_data)
-        return {"message": "Push event received and processing in background"}
+            # Get file content from GitHub
+            data = repo.get_contents(file_path, ref=ref).decoded_content
+            if looks_binary(data):
+                print(f"⏭️  Skipping {file_path} - binary")
+                continue
+
+            content = data.decode("utf-8")
+            print(f"✅ Collected content for: {file_path}")
+
+        except Exception as e:
+            print(f"❌ Failed to process {file_path}: {e}")
+            continue
 
-    return {"message": f"Event '{event_type}' received but ignored (not a push event)"}
+        yield file_path, content
 
 
-async def get_all_code_files(repo, ref, code_extensions):
-    """Get all code files from the repository"""
-    code_files = []
+def load_repo_file_filter(repo, ref, get_token) -> FileFilter:
+    """Source selection rules at ref, read locally when the mirror is in use"""
+    if SOURCE_BACKEND == "mirror":
+        try:
+            mirrors = get_mirror_cache()
+            mirrors.update(repo.full_name, repo.clone_url, get_token(), ref)
+            return load_file_filter(
+                lambda path: mirrors.read_text(repo.full_name, ref, path)
+            )
+        except Exception as e:
+            print(f"⚠️  Mirror read failed, reading file filter through the API: {e}")
+    return fetch_file_filter(repo, ref)
 
-    def traverse_contents(contents):
-        for content in contents:
-            if content.type == "file":
-                if any(content.name.endswith(ext) for ext in code_extensions):
-                    code_files.append(content.path)
-            elif content.type == "dir":
-                # Recursively traverse directories
-                try:
-                    sub_contents = repo.get_contents(content.path, ref=ref)
-                    traverse_contents(sub_contents)
-                except Exception as e:
-                    print(f"⚠️  Skipping directory {content.path}: {e}")
 
+def stream_code_files(repo, ref, get_token, file_filter: FileFilter):
+    """Yield (path, text) for every file file_filter selects at ref, from the
+    cheapest source
+
+    Every top-level directory's files come out together. The local mirror is
+    tried first, then the archive; if the archive download breaks off, the
+    files after the last one it produced are fetched individually.
+    """
+    if SOURCE_BACKEND == "mirror":
+        try:
+            print(f"🪞 Reading {ref[:7]} from local mirror...")
+            mirrors = get_mirror_cache()
+            mirrors.update(repo.full_name, repo.clone_url, get_token(), ref)
+        except Exception as e:
+            print(f"⚠️  Mirror read failed, downloading snapshot instead: {e}")
+        else:
+            yield from mirrors.iter_files(
+                repo.full_name, ref, file_filter, file_filter.max_file_size
+            )
+            return
+
+    last_path = None
     try:
-        root_contents = repo.get_contents("", ref=ref)
-        traverse_contents(root_contents)
+        print(f"📦 Downloading repository snapshot for {ref[:7]}...")
+        for file_path, content in iter_snapshot_text(
+            repo, ref, file_filter, file_filter.max_file_size
+        ):
+            last_path = file_path
+            yield file_path, content
+        return
     except Exception as e:
-        print(f"❌ Error getting repository contents: {e}")
+        print(f"⚠️  Snapshot download failed, fetching files individually: {e}")
 
-    return code_files
+    try:
+        # Sizes come with the listing, so oversized files are never requested
+        index = TreeIndex.fetch(repo, ref)
+        code_files = [
+            entry.path
+            for entry in index.entries.values()
+            if file_filter.allows(entry.path, entry.size)
+        ]
+    except Exception as e:
+        print(f"❌ Error getting repository contents: {e}")
+        return
+    # Archives list files in path order, so the rest sort after the last one
+    remaining = sorted(
+        file_path
+        for file_path in code_files
+        if last_path is None or file_path > last_path
+    )
+    yield from iter_code_files(repo, ref, remaining)
 
 
 async def process_push_event(event_data):
-    """Process push events with real GitHub API calls and documentation generation"""
+    """Process push events with real GitHub API calls and documentation generation
+
+    Raises on failure so the job queue can retry the push.
+    """
+    with start_trace(
+        "push",
+        repo=event_data["repository"]["full_name"],
+        before_sha=event_data["before"],
+        after_sha=event_data["after"],
+        delivery=",".join(event_data.get("delivery_ids", [])),
+        coalesced_pushes=event_data.get("coalesced_pushes", 1),
+    ):
+        await run_push_event(event_data)
+
+
+async def run_push_event(event_data):
+    """The body of process_push_event, inside the push's trace"""
     try:
         repo_full_name = event_data["repository"]["full_name"]
         before_sha = event_data["before"]
@@ -133,174 +338,167 @@ async def process_push_event(event_data):
         print(f"📍 After SHA: {after_sha[:7]}")
 
         # Only process main/master branch
-        if ref not in ["refs/heads/main", "refs/heads/master"]:
+        if ref not in TRACKED_REFS:
             print("⏭️  Skipping - not main/master branch")
             return
 
-        # Initialize GitHub authentication
-        try:
-            # Try to get installation ID from webhook payload first
-            installation_id = None
-            if "installation" in event_data and "id" in event_data["installation"]:
-                installation_id = event_data["installation"]["id"]
-                print(f"🔍 Found installation ID in payload: {installation_id}")
-            else:
-                # Fallback to environment variable
-                installation_id = os.getenv("GITHUB_INSTALLATION_ID")
-                if installation_id:
-                    print(
-                        f"🔍 Using installation ID from environment: {installation_id}"
-                    )
+        with stage_timer("discover"):
+            # Initialize GitHub authentication
+            try:
+                # Try to get installation ID from webhook payload first
+                installation_id = None
+                if "installation" in event_data and "id" in event_data["installation"]:
+                    installation_id = event_data["installation"]["id"]
+                    print(f"🔍 Found installation ID in payload: {installation_id}")
                 else:
-                    print(
-                        "❌ No installation ID found in webhook payload or environment"
-                    )
-                    print(f"🔍 Available webhook keys: {list(event_data.keys())}")
-                    return
-
-            github_auth = GitHubAppAuth()
-            github_client = github_auth.get_installation_client(int(installation_id))
-            print("✅ GitHub authentication successful")
-        except Exception as e:
-            print(f"❌ GitHub authentication failed: {e}")
-            return
-
-        # Get the repository object
-        try:
-            repo = github_client.get_repo(repo_full_name)
-            print(f"✅ Connected to repository: {repo_full_name}")
-        except Exception as e:
-            print(f"❌ Failed to get repository: {e}")
-            return
-
-        # Get changed files from the push
-        changed_files = []
-        if "commits" in event_data:
-            print(f"📝 Processing {len(event_data['commits'])} commits")
-            for commit in event_data["commits"]:
-                print(f"  • {commit['message']}")
-                if "added" in commit:
-                    changed_files.extend(commit["added"])
-                if "modified" in commit:
-                    changed_files.extend(commit["modified"])
-
-        # Remove duplicates and filter for code files
-        changed_files = list(set(changed_files))
-        code_extensions = {
-            ".py",
-            ".js",
-            ".ts",
-            ".jsx",
-            ".tsx",
-            ".java",
-            ".cpp",
-            ".c",
-            ".go",
-            ".rs",
-            ".php",
-            ".rb",
-            ".swift",
-            ".kt",
-            ".scala",
-            ".html",
-            ".css",
-            ".scss",
-            ".less",
-            ".sql",
-            ".sh",
-            ".bash",
-            ".yaml",
-            ".yml",
-            ".json",
-        }
-
-        code_files = [
-            f for f in changed_files if any(f.endswith(ext) for ext in code_extensions)
-        ]
-
-        # Check if docs branch exists in the same repository
-        docs_branch_exists = False
-        try:
-            docs_branch = repo.get_branch("docs")
-            docs_branch_exists = True
-            print("✅ Found existing docs branch")
-        except:
-            print(
-                "📝 Docs branch doesn't exist - will create with full codebase documentation"
-            )
+                    # Fallback to environment variable
+                    installation_id = os.getenv("GITHUB_INSTALLATION_ID")
+                    if installation_id:
+                        print(
+                            f"🔍 Using installation ID from environment: {installation_id}"
+                        )
+                    else:
+                        print(
+                            "❌ No installation ID found in webhook payload or environment"
+                        )
+                        print(f"🔍 Available webhook keys: {list(event_data.keys())}")
+                        return
+
+                github_auth = get_github_auth()
+                github_client = github_auth.get_installation_client(
+                    int(installation_id)
+                )
+                print("✅ GitHub authentication successful")
+            except Exception as e:
+                print(f"❌ GitHub authentication failed: {e}")
+                raise
 
-        git_ops = GitOperations()
-        print("✅ Initialized git operations")
+            # Get the repository object
+            try:
+                repo = github_client.get_repo(repo_full_name)
+                print(f"✅ Connected to repository: {repo_full_name}")
+            except Exception as e:
+                print(f"❌ Failed to get repository: {e}")
+                raise
+
+            def get_token():
+                return github_auth.get_installation_access_token(int(installation_id))
+
+            # Get changed files from the push
+            changed_files = []
+            if event_data.get("coalesced_pushes", 1) > 1:
+                print(f"🔗 Covers {event_data['coalesced_pushes']} coalesced pushes")
+            if "commits" in event_data:
+                print(f"📝 Processing {len(event_data['commits'])} commits")
+                for commit in event_data["commits"]:
+                    print(f"  • {commit['message']}")
+                    if "added" in commit:
+                        changed_files.extend(commit["added"])
+                    if "modified" in commit:
+                        changed_files.extend(commit["modified"])
+                    if "removed" in commit:
+                        changed_files.extend(commit["removed"])
+
+            # Remove duplicates and filter for code files; a changed filter
+            # config can select different files, so it counts as code
+            changed_files = list(set(changed_files))
+            file_filter = load_repo_file_filter(repo, after_sha, get_token)
+            code_files = [
+                f for f in changed_files if file_filter(f) or f in FILTER_CONFIG_FILES
+            ]
+
+            # Check if docs branch exists in the same repository
+            docs_branch_exists = False
+            try:
+                docs_branch = repo.get_branch("docs")
+                docs_branch_exists = True
+                print("✅ Found existing docs branch")
+            except:
+                print(
+                    "📝 Docs branch doesn't exist - will create with full codebase documentation"
+                )
 
-        # If docs branch doesn't exist, document entire codebase
-        if not docs_branch_exists:
-            print("🔄 Creating initial documentation for entire codebase...")
-            code_files = await get_all_code_files(repo, after_sha, code_extensions)
-            print(f"📄 Found {len(code_files)} code files in entire repository")
-        else:
-            # Only document changed files
-            if not code_files:
-                print("📝 No code files to document")
-                return
-            print(f"📄 Code files to document: {len(code_files)}")
+            git_ops = GitOperations()
+            print("✅ Initialized git operations")
 
-        for file in code_files[:10]:  # Show first 10
-            print(f"  • {file}")
-        if len(code_files) > 10:
-            print(f"  ... and {len(code_files) - 10} more files")
+            # If docs branch doesn't exist, document entire codebase
+            if not docs_branch_exists:
+                print("🔄 Creating initial documentation for entire codebase...")
+                manifest = DocsManifest()
+            else:
+                # Only regenerate pages affected by the changed files
+                if not code_files:
+                    print("📝 No code files to document")
+                    return
+                print(f"📄 Code files changed: {len(code_files)}")
+                manifest = DocsManifest.load(repo)
 
         # Initialize documentation generator
         docs_generator = DocsGenerator()
 
-        # Collect all code files and their content
-        code_files_content = {}
+        # Read all code files; pages are planned against the whole repository
+        # so the manifest can tell which ones changed
+        source = stream_code_files(repo, after_sha, get_token, file_filter)
+        prepared_commit = None
 
-        for file_path in code_files:
-            try:
-                print(f"📖 Processing: {file_path}")
+        if DOCS_PIPELINE == "streaming":
 
-                # Get file content from GitHub
-                file_content = repo.get_contents(file_path, ref=after_sha)
-                if file_content.size > 1000000:  # Skip files > 1MB
-                    print(
-                        f"⏭️  Skipping {file_path} - too large ({file_content.size} bytes)"
-                    )
-                    continue
+            def prepare():
+                # Runs on a pipeline thread, which needs a client of its own
+                client = github_auth.get_installation_client(int(installation_id))
+                return git_ops.prepare_atomic_commit(
+                    client.get_repo(repo_full_name, lazy=True)
+                )
 
-                content = file_content.decoded_content.decode("utf-8")
-                code_files_content[file_path] = content
-                print(f"✅ Collected content for: {file_path}")
+            prepare_commit = prepare if git_ops.atomic_commits else None
+            pipeline = DocsPipeline(docs_generator, prepare_commit)
+            docs_content = pipeline.run(repository["name"], source, manifest)
+            prepared_commit = pipeline.prepared_commit
+        else:
+            with ContentStore() as code_files_content:
+                with stage_timer("fetch"):
+                    code_files_content.update(source)
+                print(
+                    f"📄 Found {len(code_files_content)} code files in entire repository"
+                )
 
-            except Exception as e:
-                print(f"❌ Failed to process {file_path}: {e}")
-                continue
+                # Generate the documentation pages whose inputs changed
+                if code_files_content:
+                    print(
+                        f"🏗️  Generating comprehensive documentation for {len(code_files_content)} files..."
+                    )
+                    docs_content = docs_generator.generate_project_documentation(
+                        repository["name"], code_files_content, manifest=manifest
+                    )
+                else:
+                    docs_content = {}
 
-        # Generate comprehensive project documentation
-        if code_files_content:
-            print(
-                f"🏗️  Generating comprehensive documentation for {len(code_files_content)} files..."
-            )
-            docs_content = docs_generator.generate_project_documentation(
-                repository["name"], code_files_content
-            )
-            docs_created = len(docs_content)
-            print(f"✅ Generated {docs_created} documentation files")
-        else:
-            docs_content = {}
-            docs_created = 0
+        docs_created = len(docs_content)
+        print(f"✅ Generated {docs_created} documentation files")
 
         # Commit all documentation to the docs branch
-        if docs_content:
+        if docs_content or manifest.removed_pages:
+            for doc_path in manifest.removed_pages:
+                print(f"🗑️  Removing outdated page: {doc_path}")
+                docs_content[doc_path] = None
+            docs_content[DocsManifest.PATH] = manifest.to_json()
+
             try:
                 commit_msg = f"docs: {'Initial documentation' if not docs_branch_exists else f'Update docs for {after_sha[:7]}'}"
-                await git_ops.commit_docs_to_branch(
-                    repo,
-                    docs_content,
-                    commit_msg,
-                )
+                with stage_timer("commit"):
+                    await git_ops.commit_docs_to_branch(
+                        repo,
+                        docs_content,
+                        commit_msg,
+                        prepared_commit,
+                    )
                 print(f"🎉 Successfully committed {docs_created} documentation files!")
             except Exception as e:
                 print(f"❌ Failed to commit documentation: {e}")
+                # The outer handler marks the push failed and the queue retries it
+                raise
+        else:
+            print("✅ Documentation is already up to date")
 
         # Set commit status
         if docs_created > 0:
@@ -332,6 +530,9 @@ async def process_push_event(event_data):
         except:
             pass
 
+        # Let the job queue retry the push
+        raise
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,12 +1,20 @@
 import os
 import jwt
 import time
-import requests
-from github import Github
+import threading
+from datetime import datetime, timezone
 from cryptography.hazmat.primitives import serialization
 
+from src.http_clients import GITHUB_API_URL, get_github_client, get_http_session
+
 
 class GitHubAppAuth:
+    # GitHub allows app JWTs to live for at most 10 minutes
+    JWT_LIFETIME = 600
+    # Renew cached credentials this many seconds before they expire
+    JWT_REFRESH_MARGIN = 60
+    TOKEN_REFRESH_MARGIN = 300
+
     def __init__(self):
         self.app_id = os.getenv("GITHUB_APP_ID")
         self.private_key_path = os.getenv(
@@ -28,12 +36,55 @@ class GitHubAppAuth:
                 "Ensure GITHUB_PRIVATE_KEY_PATH is set correctly."
             )
 
+        self._jwt_lock = threading.Lock()
+        self._jwt_token = None
+        self._jwt_expires_at = 0
+
+        # installation_id -> (token, expires_at)
+        self._tokens = {}
+        self._tokens_lock = threading.Lock()
+        self._installation_locks = {}
+
     def get_jwt_token(self):
-        now = int(time.time())
-        payload = {"iat": now - 60, "exp": now + 600, "iss": int(self.app_id)}
-        return jwt.encode(payload, self.private_key, algorithm="RS256")
+        with self._jwt_lock:
+            now = int(time.time())
+            if (
+                self._jwt_token is None
+                or now >= self._jwt_expires_at - self.JWT_REFRESH_MARGIN
+            ):
+                expires_at = now + self.JWT_LIFETIME
+                # PyJWT rejects a non-string issuer when encoding
+                payload = {"iat": now - 60, "exp": expires_at, "iss": str(self.app_id)}
+                self._jwt_token = jwt.encode(
+                    payload, self.private_key, algorithm="RS256"
+                )
+                self._jwt_expires_at = expires_at
+            return self._jwt_token
 
     def get_installation_access_token(self, installation_id):
+        installation_id = int(installation_id)
+
+        with self._tokens_lock:
+            cached = self._tokens.get(installation_id)
+            if cached and time.time() < cached[1] - self.TOKEN_REFRESH_MARGIN:
+                return cached[0]
+            lock = self._installation_locks.setdefault(
+                installation_id, threading.Lock()
+            )
+
+        # Only one thread refreshes a given installation; the others wait for it
+        with lock:
+            with self._tokens_lock:
+                cached = self._tokens.get(installation_id)
+            if cached and time.time() < cached[1] - self.TOKEN_REFRESH_MARGIN:
+                return cached[0]
+
+            token, expires_at = self._request_installation_token(installation_id)
+            with self._tokens_lock:
+                self._tokens[installation_id] = (token, expires_at)
+            return token
+
+    def _request_installation_token(self, installation_id):
         jwt_token = self.get_jwt_token()
 
         headers = {
@@ -42,22 +93,45 @@ class GitHubAppAuth:
             "X-GitHub-Api-Version": "2022-11-28",
         }
 
-        url = (
-            f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-        )
-        response = requests.post(url, headers=headers)
+        url = f"{GITHUB_API_URL}/app/installations/{installation_id}/access_tokens"
+        response = get_http_session().post(url, headers=headers, timeout=30)
 
         if response.status_code != 201:
             raise Exception(
                 f"Failed to get access token: {response.status_code} - {response.text}"
             )
 
-        return response.json()["token"]
+        data = response.json()
+        try:
+            expires_at = (
+                datetime.strptime(data["expires_at"], "%Y-%m-%dT%H:%M:%SZ")
+                .replace(tzinfo=timezone.utc)
+                .timestamp()
+            )
+        except (KeyError, ValueError):
+            # Installation tokens are valid for one hour
+            expires_at = time.time() + 3600
+
+        return data["token"], expires_at
 
     def get_installation_client(self, installation_id):
-        access_token = self.get_installation_access_token(installation_id)
-        return Github(access_token)
+        # Pooled client that picks up refreshed tokens on its own
+        return get_github_client(self, installation_id)
 
     def get_repo_client(self, repo_full_name, installation_id):
         client = self.get_installation_client(installation_id)
         return client.get_repo(repo_full_name)
+
+
+_shared_auth = None
+_shared_auth_lock = threading.Lock()
+
+
+def get_github_auth():
+    """Process-wide GitHubAppAuth so the key is parsed and tokens are cached once"""
+    global _shared_auth
+
+    with _shared_auth_lock:
+        if _shared_auth is None:
+            _shared_auth = GitHubAppAuth()
+        return _shared_auth
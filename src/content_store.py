@@ -0,0 +1,179 @@
+"""
+Memory-bounded store for repository file contents
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, Mapping, MutableMapping, Optional, Tuple
+
+from src.storage import data_path
+
+# Decoded file text kept in memory before older files spill to disk
+CONTENT_MEMORY_BYTES = int(os.getenv("CONTENT_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+# Above this process RSS every file goes straight to disk
+CONTENT_RSS_BUDGET = int(os.getenv("CONTENT_RSS_BUDGET", str(640 * 1024 * 1024)))
+
+# RSS is sampled after this many bytes are added rather than on every file
+_RSS_CHECK_BYTES = 4 * 1024 * 1024
+
+
+def current_rss() -> Optional[int]:
+    """Resident memory of this process in bytes, where the OS reports it
+
+    File-backed pages, such as those of the spill file's memory map, are
+    left out: the kernel reclaims them under pressure instead of OOM-killing.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            fields = statm.read().split()
+        return (int(fields[1]) - int(fields[2])) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ContentStore(MutableMapping[str, str]):
+    """Path to file text mapping that keeps at most memory_bytes of it in memory
+
+    Files are kept in memory in the order they were added until
+    memory_bytes is reached, or the process RSS passes rss_budget. After
+    that the oldest ones are appended to an anonymous spill file in the
+    data directory. Looking a spilled file up decodes it from a memory map
+    of that file, so its text only lives as long as the caller holds it.
+    Call close() (or use it as a context manager) to drop the spill file.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = CONTENT_MEMORY_BYTES,
+        rss_budget: int = CONTENT_RSS_BUDGET,
+    ):
+        self.memory_bytes = memory_bytes
+        self.rss_budget = rss_budget
+        self.spilled_bytes = 0
+        self._resident: "OrderedDict[str, str]" = OrderedDict()
+        self._resident_bytes = 0
+        # Path to (offset, length) in the spill file
+        self._spilled: Dict[str, Tuple[int, int]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._unchecked_bytes = 0
+        self._over_rss = False
+        self._lock = threading.Lock()
+
+    def __getitem__(self, path: str) -> str:
+        with self._lock:
+            if path in self._resident:
+                return self._resident[path]
+            offset, length = self._spilled[path]
+            with self._view(offset, length) as view:
+                return str(view, "utf-8")
+
+    def __setitem__(self, path: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            self._discard(path)
+            self._sizes[path] = size
+            self._resident[path] = text
+            self._resident_bytes += size
+            self._unchecked_bytes += size
+            self._enforce_budget()
+
+    def __delitem__(self, path: str) -> None:
+        with self._lock:
+            if path not in self._sizes:
+                raise KeyError(path)
+            self._discard(path)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sizes))
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __contains__(self, path) -> bool:
+        return path in self._sizes
+
+    def size(self, path: str) -> int:
+        """Encoded size of a file, without loading it"""
+        return self._sizes[path]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._resident.clear()
+            self._spilled.clear()
+            self._sizes.clear()
+            self._resident_bytes = self.spilled_bytes = 0
+
+    def __enter__(self) -> "ContentStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _discard(self, path: str) -> None:
+        # The spilled bytes of a replaced file stay in the file until close()
+        self._sizes.pop(path, None)
+        self._spilled.pop(path, None)
+        text = self._resident.pop(path, None)
+        if text is not None:
+            self._resident_bytes -= len(text.encode("utf-8"))
+
+    def _enforce_budget(self) -> None:
+        if self._unchecked_bytes >= _RSS_CHECK_BYTES:
+            self._unchecked_bytes = 0
+            rss = current_rss()
+            over_rss = rss is not None and rss > self.rss_budget
+            if over_rss and not self._over_rss:
+                print(
+                    f"⚠️  Process RSS {rss // (1024 * 1024)} MB is over the "
+                    f"{self.rss_budget // (1024 * 1024)} MB budget; "
+                    "spilling file contents to disk"
+                )
+            self._over_rss = over_rss
+
+        limit = 0 if self._over_rss else self.memory_bytes
+        while self._resident and self._resident_bytes > limit:
+            path, text = self._resident.popitem(last=False)
+            data = text.encode("utf-8")
+            self._resident_bytes -= len(data)
+            self._spill(path, data)
+
+    def _spill(self, path: str, data: bytes) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(
+                prefix="content-", dir=os.path.dirname(data_path("content"))
+            )
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._spilled[path] = (offset, len(data))
+        self.spilled_bytes += len(data)
+
+    def _view(self, offset: int, length: int) -> memoryview:
+        if length == 0:
+            return memoryview(b"")
+        end = offset + length
+        if self._map is None or len(self._map) < end:
+            # The map only covers the file as it was when created
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset:end]
+
+
+def content_size(files: Mapping[str, str], path: str) -> int:
+    """Size of a file's text, without loading it when files is a ContentStore"""
+    if isinstance(files, ContentStore):
+        return files.size(path)
+    return len(files[path])
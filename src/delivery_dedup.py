@@ -0,0 +1,92 @@
+"""
+Duplicate webhook delivery detection keyed on X-GitHub-Delivery
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class DeliveryDeduplicator:
+    """Recently seen delivery IDs, held in memory and in an append-only log
+
+    IDs expire after ttl seconds and the in-memory set never grows beyond
+    max_entries, so lookups stay constant time. The log lets a restarted
+    process keep rejecting redeliveries of work it already queued.
+    """
+
+    def __init__(
+        self, log_path: str, ttl: float = 3 * 24 * 3600, max_entries: int = 100000
+    ):
+        self.log_path = log_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.duplicates = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lines = 0
+
+        self._load()
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+
+        cutoff = time.time() - self.ttl
+        with open(self.log_path, "r", encoding="utf-8") as log:
+            for line in log:
+                seen_at, _, delivery_id = line.rstrip("\n").partition(" ")
+                try:
+                    if float(seen_at) >= cutoff and delivery_id:
+                        self._remember(delivery_id, float(seen_at))
+                except ValueError:
+                    continue  # Partially written line from a crash
+
+        self._rewrite_log()
+
+    def _rewrite_log(self) -> None:
+        # Keep only live entries so the log stays proportional to max_entries
+        temp_path = f"{self.log_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as log:
+            for delivery_id, seen_at in self._seen.items():
+                log.write(f"{seen_at} {delivery_id}\n")
+        os.replace(temp_path, self.log_path)
+        self._log_lines = len(self._seen)
+
+    def _remember(self, delivery_id: str, seen_at: float) -> None:
+        self._seen[delivery_id] = seen_at
+        self._seen.move_to_end(delivery_id)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        # Entries are in arrival order, so expired ones are always at the front
+        cutoff = now - self.ttl
+        while self._seen:
+            oldest_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            del self._seen[oldest_id]
+
+    def is_duplicate(self, delivery_id: str) -> bool:
+        with self._lock:
+            self._expire(time.time())
+            if delivery_id in self._seen:
+                self.duplicates += 1
+                return True
+            return False
+
+    def record(self, delivery_id: str) -> None:
+        with self._lock:
+            now = time.time()
+            self._remember(delivery_id, now)
+            self._log.write(f"{now} {delivery_id}\n")
+            self._log.flush()
+            self._log_lines += 1
+
+            if self._log_lines > 2 * self.max_entries:
+                self._log.close()
+                self._rewrite_log()
+                self._log = open(self.log_path, "a", encoding="utf-8")
@@ -2,10 +2,142 @@
 Documentation generation using Google Gemini AI
 """
 
+import contextvars
 import os
+import threading
+import time
 import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from functools import partial
+from typing import Optional, Dict, List, Any, Callable, Mapping, Set
+
+from src.content_store import content_size
+from src.llm_cache import get_llm_cache
+from src.manifest import DocsManifest, fingerprint
+from src.metrics import (
+    GEMINI_PROMPT_TOKENS,
+    GEMINI_REQUEST_SECONDS,
+    GEMINI_REQUESTS,
+    gemini_section,
+    stage_timer,
+)
+from src.prompt_builder import (
+    PRIORITY_CHANGED,
+    PRIORITY_ENTRY_POINT,
+    PRIORITY_SOURCE,
+    PRIORITY_SYMBOLS,
+    PromptBuilder,
+    estimate_tokens,
+)
+from src.summary_tree import SummaryTree
+from src.symbols import FileSymbols, build_symbol_index, extract_symbols
+from src.tracing import in_current_context, span
+from src.tree_index import git_blob_sha
+
+MODEL_NAME = "gemini-1.5-flash"
+
+# "direct" packs source into each page's prompt; "hierarchical" summarises
+# files, then modules, and builds the top-level pages from module summaries
+DOCS_STRATEGIES = ("direct", "hierarchical")
+TOP_LEVEL_PAGES = ("README.md", "docs/ARCHITECTURE.md")
+
+# Imported packages that mark a file as serving or routing HTTP requests
+API_IMPORT_HINTS = ("fastapi", "flask", "django", "express", "koa", "net/http", "gin")
+DATABASE_IMPORT_HINTS = ("sql", "database", "mongo", "redis", "prisma", "mongoose")
+
+
+# Raised by the _fallback_* pages of the section running in this context, and
+# by the summaries it reads when those fell back (see _mark_fallback)
+_fell_back: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "intellidocs_fell_back", default=False
+)
+
+
+def forget_fallback_pages(
+    manifest: Optional[DocsManifest], sections: List["DocSection"]
+) -> None:
+    """Leave fallback pages out of the manifest so the next run regenerates them"""
+    fallbacks = [section.path for section in sections if section.fell_back]
+    if manifest is not None and fallbacks:
+        print(f"⚠️  {len(fallbacks)} pages used fallback content; will retry them")
+        manifest.forget(fallbacks)
+
+
+@dataclass
+class DocSection:
+    """One documentation page and everything its prompt is built from"""
+
+    path: str
+    generate: Callable[..., str]
+    args: tuple
+    # Source files whose content is read into the prompt
+    sources: List[str]
+    # Fingerprint of the remaining prompt inputs (names, analysis results)
+    context: str
+    # Set by run() when the page is fallback content rather than generated
+    fell_back: bool = False
+
+    def run(self) -> str:
+        token = _fell_back.set(False)
+        try:
+            with span("section", page=self.path) as section_span:
+                text = self.generate(*self.args)
+                self.fell_back = _fell_back.get()
+                section_span.set_attribute("fell_back", self.fell_back)
+                return text
+        finally:
+            _fell_back.reset(token)
+
+
+@dataclass
+class CodeContext:
+    """Source a prompt can draw on: raw files, their symbols and what changed"""
+
+    files: Mapping[str, str]
+    symbols: Dict[str, FileSymbols]
+    changed: Set[str]
+    # Only set for the hierarchical strategy
+    summaries: Optional[SummaryTree] = None
+
+
+def _source_block(files: Mapping[str, str], file_path: str) -> str:
+    return f"--- {file_path} ---\n{files[file_path]}"
+
+
+def module_name(file_path: str) -> str:
+    """Module a file is documented under: its top-level directory or root"""
+    return file_path.split("/")[0] if "/" in file_path else "root"
+
+
+def analysis_overview(analysis: Dict[str, Any]) -> str:
+    """The project analysis for a prompt header: flags, names and counts only
+
+    File lists grow with the repository, so prompts take them as budgeted
+    blocks from module_listing instead.
+    """
+    modules = ", ".join(
+        f"{name} ({len(files)} files)" for name, files in analysis["modules"].items()
+    )
+    return f"""
+        Type: {analysis['project_type']}
+        Technologies: {', '.join(analysis['main_technologies'])}
+        Has API: {analysis['has_api']}
+        Has Database: {analysis['has_database']}
+        Has Auth: {analysis['has_auth']}
+        Has Tests: {analysis['has_tests']}
+        Entry Points: {analysis['entry_points']}
+        Modules: {modules}
+        """
+
+
+def module_listing(modules: Dict[str, List[str]]) -> List[str]:
+    """One prompt block per module naming its files"""
+    return [
+        f"--- Files in {name} ---\n" + "\n".join(files)
+        for name, files in modules.items()
+    ]
 
 
 def configure_gemini():
@@ -15,7 +147,26 @@ def configure_gemini():
         raise ValueError("GEMINI_API_KEY environment variable not set")
 
     genai.configure(api_key=api_key)
-    return genai.GenerativeModel("gemini-1.5-flash")
+    return genai.GenerativeModel(MODEL_NAME)
+
+
+_gemini_model = None
+_gemini_lock = threading.Lock()
+
+
+def get_gemini_model():
+    """Process-wide Gemini model, configured once, or None without an API key"""
+    global _gemini_model
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+
+    with _gemini_lock:
+        if _gemini_model is None:
+            genai.configure(api_key=api_key)
+            _gemini_model = genai.GenerativeModel(MODEL_NAME)
+        return _gemini_model
 
 
 def get_file_type_context(file_path: str) -> str:
@@ -64,20 +215,14 @@ def generate_fallback_docs(file_content: str, file_path: str) -> str:
     file_type = get_file_type_context(file_path)
 
     # Extract some basic info
-    imports = []
-    functions = []
-    classes = []
-
-    for line in file_content.split("\n"):
-        line = line.strip()
-        if line.startswith("import ") or line.startswith("from "):
-            imports.append(line)
-        elif line.startswith("def "):
-            func_name = line.split("(")[0].replace("def ", "")
-            functions.append(func_name)
-        elif line.startswith("class "):
-            class_name = line.split("(")[0].split(":")[0].replace("class ", "")
-            classes.append(class_name)
+    file_symbols = extract_symbols(file_path, file_content)
+    imports = file_symbols.imports
+    classes = file_symbols.names("class", "type")
+    functions = [
+        symbol.name if not symbol.parent else f"{symbol.parent}.{symbol.name}"
+        for symbol in file_symbols.symbols
+        if symbol.kind in ("function", "method")
+    ]
 
     doc = f"""# Documentation for {file_path}
 
@@ -113,56 +258,294 @@ This {file_type} contains {lines} lines of code ({chars} characters).
 
 
 class DocsGenerator:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+    def __init__(
+        self, max_concurrency: Optional[int] = None, strategy: Optional[str] = None
+    ):
+        # Number of documentation sections generated at the same time
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("DOCS_MAX_CONCURRENCY", "4")
+        )
+
+        self.strategy = (strategy or os.getenv("DOCS_STRATEGY", "direct")).lower()
+        if self.strategy not in DOCS_STRATEGIES:
+            print(f"⚠️  Unknown DOCS_STRATEGY '{self.strategy}', using 'direct'")
+            self.strategy = "direct"
+
+        self.client = get_gemini_model()
+        if not self.client:
             print(
                 "⚠️  GEMINI_API_KEY not found. Documentation will use fallback content."
             )
-            self.client = None
-        else:
-            genai.configure(api_key=api_key)
-            self.client = genai.GenerativeModel("gemini-1.5-flash")
+
+        self.model_name = MODEL_NAME
+        self.cache = get_llm_cache() if self.client else None
+
+        # Estimated tokens each code-bearing prompt may use
+        self.prompt_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
 
     def generate_project_documentation(
-        self, repo_name: str, code_files: Dict[str, str]
+        self,
+        repo_name: str,
+        code_files: Dict[str, str],
+        manifest: Optional[DocsManifest] = None,
     ) -> Dict[str, str]:
-        """Generate comprehensive project documentation"""
+        """Generate comprehensive project documentation
 
-        # Analyze the codebase structure
-        project_analysis = self._analyze_project_structure(code_files)
+        When a manifest is given, only pages whose inputs changed since it was
+        written are generated, and the manifest is updated to match.
+        """
+        with stage_timer("analyze"):
+            if manifest is None:
+                sections = self.plan_sections(repo_name, code_files)
+            else:
+                blob_shas = {
+                    file_path: git_blob_sha(content.encode("utf-8"))
+                    for file_path, content in code_files.items()
+                }
+                changed_files = {
+                    file_path
+                    for file_path, sha in blob_shas.items()
+                    if manifest.files.get(file_path) != sha
+                }
+
+                sections = self.plan_sections(repo_name, code_files, changed_files)
+                sections = manifest.refresh(sections, blob_shas)
+                print(f"📝 {len(sections)} documentation pages need regenerating")
+
+        with stage_timer("generate"):
+            self._prepare_summaries(sections)
+            docs = self._run_sections(sections)
+        forget_fallback_pages(manifest, sections)
+        return docs
 
-        docs = {}
+    def plan_sections(
+        self,
+        repo_name: str,
+        code_files: Dict[str, str],
+        changed_files: Optional[Set[str]] = None,
+        code: Optional[CodeContext] = None,
+    ) -> List[DocSection]:
+        """Lay out every documentation page along with the inputs of its prompt
+
+        A CodeContext built up while the files were fetched can be passed in
+        to reuse its symbols and summaries.
+        """
+
+        # Analyze the codebase structure from a compact index of each file
+        if code is None:
+            code = CodeContext(
+                code_files, build_symbol_index(code_files), changed_files or set()
+            )
+        symbol_index = code.symbols
+        project_analysis = self._analyze_project_structure(symbol_index)
+        all_files = list(code_files)
+
+        # Pages built from summaries are different pages, so the strategy is
+        # part of their recorded inputs
+        strategy = ()
+        if self.strategy == "hierarchical" and self.client:
+            if code.summaries is None:
+                code.summaries = SummaryTree(self, code, project_analysis["modules"])
+            else:
+                code.summaries.modules = project_analysis["modules"]
+            strategy = (self.strategy,)
 
         # 1. Main README - Project Overview
-        docs["README.md"] = self._generate_project_overview(
-            repo_name, project_analysis, code_files
-        )
+        sections = [
+            DocSection(
+                "README.md",
+                self._generate_project_overview,
+                (repo_name, project_analysis, code),
+                all_files,
+                fingerprint(repo_name, project_analysis, *strategy),
+            ),
+        ]
 
         # 2. Architecture Documentation
-        docs["docs/ARCHITECTURE.md"] = self._generate_architecture_docs(
-            project_analysis, code_files
+        sections.append(
+            DocSection(
+                "docs/ARCHITECTURE.md",
+                self._generate_architecture_docs,
+                (project_analysis, code),
+                all_files,
+                fingerprint(project_analysis, *strategy),
+            )
         )
 
         # 3. API Documentation (if applicable)
         if project_analysis.get("has_api"):
-            docs["docs/API.md"] = self._generate_api_docs(project_analysis, code_files)
+            sections.append(
+                DocSection(
+                    "docs/API.md",
+                    self._generate_api_docs,
+                    (project_analysis, code),
+                    self._api_files(symbol_index),
+                    fingerprint(project_analysis),
+                )
+            )
 
         # 4. Setup & Installation Guide
-        docs["docs/SETUP.md"] = self._generate_setup_guide(repo_name, project_analysis)
+        sections.append(
+            DocSection(
+                "docs/SETUP.md",
+                self._generate_setup_guide,
+                (repo_name, project_analysis),
+                [],
+                fingerprint(repo_name, project_analysis),
+            )
+        )
 
         # 5. Developer Guide
-        docs["docs/DEVELOPMENT.md"] = self._generate_developer_guide(
-            project_analysis, code_files
+        sections.append(
+            DocSection(
+                "docs/DEVELOPMENT.md",
+                self._generate_developer_guide,
+                (project_analysis, code),
+                [],
+                fingerprint(project_analysis),
+            )
         )
 
         # 6. Module Documentation (organized by functionality)
-        module_docs = self._generate_module_docs(project_analysis, code_files)
-        docs.update(module_docs)
+        sections.extend(self._module_sections(project_analysis, code, strategy))
+
+        return sections
+
+    def _prepare_summaries(self, sections: List[DocSection]) -> None:
+        """Summarise, in parallel, whatever the pages about to run will read"""
+        summaries = None
+        for section in sections:
+            for arg in section.args:
+                if isinstance(arg, CodeContext) and arg.summaries is not None:
+                    summaries = arg.summaries
+        if summaries is None:
+            return
+
+        module_files = [
+            file_path
+            for section in sections
+            if section.path.startswith("docs/modules/")
+            for file_path in section.sources
+        ]
+        modules = []
+        if any(section.path in TOP_LEVEL_PAGES for section in sections):
+            modules = list(summaries.modules)
+
+        summaries.prepare(module_files, modules)
+
+    def _run_sections(self, sections: List[DocSection]) -> Dict[str, str]:
+        """Generate sections concurrently, keeping their original order"""
+        if self.max_concurrency <= 1 or len(sections) <= 1:
+            return {section.path: section.run() for section in sections}
+
+        workers = min(self.max_concurrency, len(sections))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (section.path, executor.submit(in_current_context(section.run)))
+                for section in sections
+            ]
+            return {doc_path: future.result() for doc_path, future in futures}
+
+    def _pack_prompt(
+        self,
+        section: str,
+        header: str,
+        code: CodeContext,
+        file_paths: List[str],
+        entry_points: List[str],
+        details: List[str] = (),
+    ) -> str:
+        """Fill the prompt budget with symbols and details (such as file lists),
+        then entry points, changed files and finally any other source that
+        still fits"""
+        builder = PromptBuilder(self.prompt_budget, header)
+
+        for file_path in file_paths:
+            builder.add(code.symbols[file_path].summary(), PRIORITY_SYMBOLS)
+        for detail in details:
+            builder.add(detail, PRIORITY_SYMBOLS)
+
+        for file_path in file_paths:
+            if file_path in entry_points:
+                priority = PRIORITY_ENTRY_POINT
+            elif file_path in code.changed:
+                priority = PRIORITY_CHANGED
+            else:
+                priority = PRIORITY_SOURCE
+            # Loaded only if it fits, so large modules never sit in memory whole
+            builder.add(
+                partial(_source_block, code.files, file_path),
+                priority,
+                size=len(file_path) + 9 + content_size(code.files, file_path),
+            )
 
-        return docs
+        prompt = builder.build()
+        if builder.truncated or builder.omitted:
+            print(
+                f"📏 {section}: packed {builder.included} of {len(builder.blocks)} "
+                f"context blocks ({builder.truncated} truncated) "
+                f"into ~{builder.tokens} tokens"
+            )
+        return prompt
+
+    def _context_prompt(
+        self,
+        section: str,
+        header: str,
+        code: CodeContext,
+        file_paths: List[str],
+        entry_points: List[str],
+        details: List[str] = (),
+    ) -> str:
+        """The header followed by source, or by summaries when hierarchical"""
+        if code.summaries is None:
+            return self._pack_prompt(
+                section, header, code, file_paths, entry_points, details
+            )
+        if section in TOP_LEVEL_PAGES:
+            return code.summaries.module_context(self.prompt_budget, header, details)
+        return code.summaries.file_context(
+            self.prompt_budget, header, file_paths, details
+        )
+
+    def _generate(
+        self, prompt: str, section: str = "", cache_key: Optional[str] = None
+    ) -> str:
+        """Call Gemini, serving byte-identical prompts from the response cache
 
-    def _analyze_project_structure(self, code_files: Dict[str, str]) -> Dict[str, Any]:
+        cache_key replaces the prompt hash when the caller has a cheaper
+        identity for the inputs, such as a blob SHA.
+        """
+        if self.cache is None:
+            return self._call_model(prompt, section)
+
+        key = cache_key or self.cache.key_for(self.model_name, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        text = self._call_model(prompt, section)
+        self.cache.put(key, text)
+        return text
+
+    def _call_model(self, prompt: str, section: str) -> str:
+        label = gemini_section(section)
+        GEMINI_PROMPT_TOKENS.labels(label).observe(estimate_tokens(prompt))
+        started = time.perf_counter()
+        try:
+            with span("gemini", section=section, prompt_bytes=len(prompt)):
+                text = self.client.generate_content(prompt).text
+        except Exception:
+            GEMINI_REQUESTS.labels(label, "error").inc()
+            raise
+        finally:
+            GEMINI_REQUEST_SECONDS.labels(label).observe(time.perf_counter() - started)
+        GEMINI_REQUESTS.labels(label, "ok").inc()
+        return text
+
+    def _analyze_project_structure(
+        self, symbol_index: Dict[str, FileSymbols]
+    ) -> Dict[str, Any]:
         """Analyze the project to understand its structure and purpose"""
 
         analysis = {
@@ -176,20 +559,26 @@ class DocsGenerator:
             "entry_points": [],
         }
 
-        # Analyze each file to understand project structure
-        for file_path, content in code_files.items():
+        # Analyze each file to understand project structure, in a stable order
+        for file_path in sorted(symbol_index):
+            file_symbols = symbol_index[file_path]
+            imports = " ".join(file_symbols.imports).lower()
+            names = " ".join(symbol.name for symbol in file_symbols.symbols).lower()
+
             # Detect project type and technologies
-            if "fastapi" in content.lower() or "flask" in content.lower():
+            if "fastapi" in imports or "flask" in imports:
                 analysis["project_type"] = "web_api"
                 analysis["has_api"] = True
-                analysis["main_technologies"].append(
-                    "FastAPI" if "fastapi" in content.lower() else "Flask"
-                )
+                technology = "FastAPI" if "fastapi" in imports else "Flask"
+                if technology not in analysis["main_technologies"]:
+                    analysis["main_technologies"].append(technology)
 
-            if "auth" in file_path.lower() or "login" in content.lower():
+            if "auth" in file_path.lower() or "login" in names or "auth" in imports:
                 analysis["has_auth"] = True
 
-            if "database" in content.lower() or "sql" in content.lower():
+            if file_symbols.language == "SQL" or any(
+                hint in imports for hint in DATABASE_IMPORT_HINTS
+            ):
                 analysis["has_database"] = True
 
             if "test" in file_path.lower():
@@ -199,20 +588,18 @@ class DocsGenerator:
                 analysis["entry_points"].append(file_path)
 
             # Group files by module/directory
-            if "/" in file_path:
-                module = file_path.split("/")[0]
-                if module not in analysis["modules"]:
-                    analysis["modules"][module] = []
-                analysis["modules"][module].append(file_path)
-            else:
-                if "root" not in analysis["modules"]:
-                    analysis["modules"]["root"] = []
-                analysis["modules"]["root"].append(file_path)
+            module = module_name(file_path)
+            if module not in analysis["modules"]:
+                analysis["modules"][module] = []
+            analysis["modules"][module].append(file_path)
 
         return analysis
 
     def _generate_project_overview(
-        self, repo_name: str, analysis: Dict[str, Any], code_files: Dict[str, str]
+        self,
+        repo_name: str,
+        analysis: Dict[str, Any],
+        code: CodeContext,
     ) -> str:
         """Generate main project README"""
 
@@ -228,9 +615,6 @@ class DocsGenerator:
         Has Auth: {analysis['has_auth']}
         Modules: {list(analysis['modules'].keys())}
         Entry Points: {analysis['entry_points']}
-        
-        Code files overview:
-        {self._get_code_summary(code_files)}
         """
 
         prompt = f"""
@@ -246,17 +630,20 @@ class DocsGenerator:
         Make it professional and informative. Use proper markdown formatting.
         
         Context: {context}
+        Code files overview:
         """
+        prompt = self._context_prompt(
+            "README.md", prompt, code, list(code.files), analysis["entry_points"]
+        )
 
         try:
-            response = self.client.generate_content(prompt)
-            return response.text
+            return self._generate(prompt, "README.md")
         except Exception as e:
             print(f"⚠️  AI generation failed for project overview: {e}")
             return self._fallback_project_overview(repo_name, analysis)
 
     def _generate_architecture_docs(
-        self, analysis: Dict[str, Any], code_files: Dict[str, str]
+        self, analysis: Dict[str, Any], code: CodeContext
     ) -> str:
         """Generate architecture documentation"""
 
@@ -264,8 +651,7 @@ class DocsGenerator:
             return self._fallback_architecture_docs(analysis)
 
         context = f"""
-        Project Analysis: {analysis}
-        Code Structure: {self._get_code_summary(code_files)}
+        Project Analysis: {analysis_overview(analysis)}
         """
 
         prompt = f"""
@@ -282,32 +668,29 @@ class DocsGenerator:
         Use Mermaid diagrams where appropriate. Make it technical but clear.
         
         Context: {context}
+        Code Structure:
         """
+        prompt = self._context_prompt(
+            "docs/ARCHITECTURE.md",
+            prompt,
+            code,
+            list(code.files),
+            analysis["entry_points"],
+            module_listing(analysis["modules"]),
+        )
 
         try:
-            response = self.client.generate_content(prompt)
-            return response.text
+            return self._generate(prompt, "docs/ARCHITECTURE.md")
         except Exception as e:
             print(f"⚠️  AI generation failed for architecture docs: {e}")
             return self._fallback_architecture_docs(analysis)
 
-    def _generate_api_docs(
-        self, analysis: Dict[str, Any], code_files: Dict[str, str]
-    ) -> str:
+    def _generate_api_docs(self, analysis: Dict[str, Any], code: CodeContext) -> str:
         """Generate API documentation"""
 
         if not self.client:
             return self._fallback_api_docs()
 
-        # Extract API-related code
-        api_code = ""
-        for file_path, content in code_files.items():
-            if any(
-                keyword in content.lower()
-                for keyword in ["@app.", "router", "endpoint", "api"]
-            ):
-                api_code += f"\n--- {file_path} ---\n{content[:2000]}"
-
         prompt = f"""
         Create comprehensive API documentation. Include:
         
@@ -319,16 +702,34 @@ class DocsGenerator:
         6. Rate limiting (if applicable)
         7. SDKs or client libraries
         
-        API Code Context: {api_code}
+        API Code Context:
         """
+        prompt = self._pack_prompt(
+            "docs/API.md",
+            prompt,
+            code,
+            self._api_files(code.symbols),
+            analysis["entry_points"],
+        )
 
         try:
-            response = self.client.generate_content(prompt)
-            return response.text
+            return self._generate(prompt, "docs/API.md")
         except Exception as e:
             print(f"⚠️  AI generation failed for API docs: {e}")
             return self._fallback_api_docs()
 
+    def _api_files(self, symbol_index: Dict[str, FileSymbols]) -> List[str]:
+        """Files that look like they define API endpoints"""
+        api_files = []
+        for file_path, file_symbols in symbol_index.items():
+            imports = " ".join(file_symbols.imports).lower()
+            signatures = " ".join(s.signature for s in file_symbols.symbols).lower()
+            if any(hint in imports for hint in API_IMPORT_HINTS) or any(
+                keyword in signatures for keyword in ["@app.", "router", "endpoint"]
+            ):
+                api_files.append(file_path)
+        return api_files
+
     def _generate_setup_guide(self, repo_name: str, analysis: Dict[str, Any]) -> str:
         """Generate setup and installation guide"""
 
@@ -349,14 +750,13 @@ class DocsGenerator:
         """
 
         try:
-            response = self.client.generate_content(prompt)
-            return response.text
+            return self._generate(prompt, "docs/SETUP.md")
         except Exception as e:
             print(f"⚠️  AI generation failed for setup guide: {e}")
             return self._fallback_setup_guide(repo_name, analysis)
 
     def _generate_developer_guide(
-        self, analysis: Dict[str, Any], code_files: Dict[str, str]
+        self, analysis: Dict[str, Any], code: CodeContext
     ) -> str:
         """Generate developer guide"""
 
@@ -373,12 +773,20 @@ class DocsGenerator:
         5. Contributing guidelines
         6. Code review process
         
-        Project Analysis: {analysis}
+        Project Analysis: {analysis_overview(analysis)}
+        Project files:
         """
+        prompt = self._pack_prompt(
+            "docs/DEVELOPMENT.md",
+            prompt,
+            code,
+            [],
+            [],
+            module_listing(analysis["modules"]),
+        )
 
         try:
-            response = self.client.generate_content(prompt)
-            return response.text
+            return self._generate(prompt, "docs/DEVELOPMENT.md")
         except Exception as e:
             print(f"⚠️  AI generation failed for developer guide: {e}")
             return self._fallback_developer_guide(analysis)
@@ -387,64 +795,76 @@ class DocsGenerator:
         self, analysis: Dict[str, Any], code_files: Dict[str, str]
     ) -> Dict[str, str]:
         """Generate documentation for each module/directory"""
+        code = CodeContext(code_files, build_symbol_index(code_files), set())
+        return self._run_sections(self._module_sections(analysis, code))
 
-        module_docs = {}
-
+    def _module_sections(
+        self, analysis: Dict[str, Any], code: CodeContext, strategy: tuple = ()
+    ) -> List[DocSection]:
+        sections = []
         for module_name, files in analysis["modules"].items():
             if module_name == "root":
                 continue  # Skip root files, covered in main docs
 
-            # Get code for this module
-            module_code = ""
-            for file_path in files:
-                if file_path in code_files:
-                    module_code += (
-                        f"\n--- {file_path} ---\n{code_files[file_path][:1500]}"
-                    )
-
-            if not self.client:
-                module_docs[f"docs/modules/{module_name}.md"] = (
-                    self._fallback_module_docs(module_name, files)
+            sections.append(
+                DocSection(
+                    f"docs/modules/{module_name}.md",
+                    self._generate_module_doc,
+                    (module_name, files, code),
+                    [file_path for file_path in files if file_path in code.files],
+                    fingerprint(module_name, files, *strategy),
                 )
-                continue
+            )
+        return sections
 
-            prompt = f"""
-            Create documentation for the '{module_name}' module. Include:
-            
-            1. Module purpose and overview
-            2. Key components and classes
-            3. Public APIs and interfaces
-            4. Usage examples
-            5. Integration with other modules
-            
-            Module files: {files}
-            Code context: {module_code}
-            """
-
-            try:
-                response = self.client.generate_content(prompt)
-                module_docs[f"docs/modules/{module_name}.md"] = response.text
-            except Exception as e:
-                print(f"⚠️  AI generation failed for module {module_name}: {e}")
-                module_docs[f"docs/modules/{module_name}.md"] = (
-                    self._fallback_module_docs(module_name, files)
-                )
+    def _generate_module_doc(
+        self,
+        module_name: str,
+        files: List[str],
+        code: CodeContext,
+    ) -> str:
+        """Generate documentation for a single module/directory"""
+
+        if not self.client:
+            return self._fallback_module_docs(module_name, files, code.symbols)
+
+        prompt = f"""
+        Create documentation for the '{module_name}' module. Include:
+        
+        1. Module purpose and overview
+        2. Key components and classes
+        3. Public APIs and interfaces
+        4. Usage examples
+        5. Integration with other modules
+        
+        Module files: {len(files)}
+        Code context:
+        """
+        doc_path = f"docs/modules/{module_name}.md"
+        prompt = self._context_prompt(
+            doc_path,
+            prompt,
+            code,
+            [file_path for file_path in files if file_path in code.files],
+            [],
+            module_listing({module_name: files}),
+        )
 
-        return module_docs
+        try:
+            return self._generate(prompt, doc_path)
+        except Exception as e:
+            print(f"⚠️  AI generation failed for module {module_name}: {e}")
+            return self._fallback_module_docs(module_name, files, code.symbols)
 
-    def _get_code_summary(self, code_files: Dict[str, str]) -> str:
-        """Get a summary of all code files"""
-        summary = ""
-        for file_path, content in code_files.items():
-            # Get first few lines and key functions/classes
-            lines = content.split("\n")[:10]
-            summary += f"\n{file_path}: {' '.join(lines)}"[:200] + "..."
-        return summary
+    def _mark_fallback(self) -> None:
+        """Flag the page being generated in this context as fallback content"""
+        _fell_back.set(True)
 
     # Fallback methods for when AI is not available
     def _fallback_project_overview(
         self, repo_name: str, analysis: Dict[str, Any]
     ) -> str:
+        _fell_back.set(True)
         return f"""# {repo_name}
 
 ## Overview
@@ -473,6 +893,7 @@ This is a {analysis['project_type']} project with the following characteristics:
 """
 
     def _fallback_architecture_docs(self, analysis: Dict[str, Any]) -> str:
+        _fell_back.set(True)
         return f"""# Architecture Documentation
 
 ## System Overview
@@ -493,6 +914,7 @@ Each module has specific responsibilities and interacts with others through well
 """
 
     def _fallback_api_docs(self) -> str:
+        _fell_back.set(True)
         return """# API Documentation
 
 ## Overview
@@ -509,6 +931,7 @@ This document describes the API endpoints and their usage.
 """
 
     def _fallback_setup_guide(self, repo_name: str, analysis: Dict[str, Any]) -> str:
+        _fell_back.set(True)
         return f"""# Setup Guide
 
 ## Prerequisites
@@ -543,6 +966,7 @@ This document describes the API endpoints and their usage.
 """
 
     def _fallback_developer_guide(self, analysis: Dict[str, Any]) -> str:
+        _fell_back.set(True)
         return f"""# Developer Guide
 
 ## Development Setup
@@ -568,7 +992,23 @@ The project is organized into {len(analysis['modules'])} main modules:
 5. Submit a pull request
 """
 
-    def _fallback_module_docs(self, module_name: str, files: List[str]) -> str:
+    def _fallback_module_docs(
+        self,
+        module_name: str,
+        files: List[str],
+        symbol_index: Optional[Dict[str, FileSymbols]] = None,
+    ) -> str:
+        _fell_back.set(True)
+        components = []
+        for file_path in files:
+            file_symbols = (symbol_index or {}).get(file_path)
+            if file_symbols is None:
+                continue
+            for symbol in file_symbols.symbols:
+                if not symbol.parent:
+                    doc = f" - {symbol.doc}" if symbol.doc else ""
+                    components.append(f"- `{symbol.name}` ({file_path}){doc}")
+
         return f"""# {module_name.title()} Module
 
 ## Overview
@@ -579,7 +1019,7 @@ This module contains the following files:
 [Module purpose to be documented]
 
 ## Key Components
-[Key components to be documented based on code analysis]
+{chr(10).join(components[:50]) if components else "[Key components to be documented based on code analysis]"}
 
 ## Usage
 [Usage examples to be provided]
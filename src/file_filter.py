@@ -0,0 +1,289 @@
+"""
+Source file selection: which files in a repository are documented
+"""
+
+import base64
+import re
+from typing import Callable, Iterable, List, Optional, Pattern, Tuple
+
+import yaml
+
+CONFIG_FILE = ".intellidocs.yml"
+ATTRIBUTES_FILE = ".gitattributes"
+# Files that change which other files are selected
+FILTER_CONFIG_FILES = (CONFIG_FILE, ATTRIBUTES_FILE)
+
+DEFAULT_INCLUDE = (
+    "*.py",
+    "*.js",
+    "*.ts",
+    "*.jsx",
+    "*.tsx",
+    "*.java",
+    "*.cpp",
+    "*.c",
+    "*.go",
+    "*.rs",
+    "*.php",
+    "*.rb",
+    "*.swift",
+    "*.kt",
+    "*.scala",
+    "*.html",
+    "*.css",
+    "*.scss",
+    "*.less",
+    "*.sql",
+    "*.sh",
+    "*.bash",
+    "*.yaml",
+    "*.yml",
+    "*.json",
+)
+
+# Vendored, generated, minified and lock files: large, and nothing to document
+DEFAULT_EXCLUDE = (
+    ".*/",
+    "node_modules/",
+    "bower_components/",
+    "vendor/",
+    "third_party/",
+    "site-packages/",
+    "dist/",
+    "build/",
+    "target/",
+    "coverage/",
+    "__pycache__/",
+    "*.min.js",
+    "*.min.css",
+    "*.bundle.js",
+    "*.map",
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "Pipfile.lock",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.generated.*",
+)
+
+# .gitattributes attributes that take a file out, as GitHub Linguist does
+LINGUIST_ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+
+# Files larger than this are never sent to the documentation generator
+MAX_FILE_SIZE = 1000000
+
+# How much of a file git looks at when deciding whether it is binary
+BINARY_SNIFF_BYTES = 8000
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a .gitignore-style glob into a regular expression
+
+    A pattern without a slash matches a name at any depth; one with a slash
+    is anchored at the repository root. A trailing slash matches everything
+    under a directory, "**" spans directories and "*" stays within one.
+    """
+    directory = pattern.endswith("/")
+    pattern = pattern.strip("/") if directory else pattern
+    anchored = pattern.startswith("/") or "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end]
+            negate = body.startswith("!")
+            if negate:
+                body = body[1:]
+            # Only a leading "!" negates; "\\", "^" and "[" are literal inside
+            for special in ("\\", "^", "["):
+                body = body.replace(special, "\\" + special)
+            regex += "[" + ("^" if negate else "") + body + "]"
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return regex + ("/.*" if directory else "")
+
+
+def compile_globs(patterns: Iterable[str]) -> Optional[Pattern]:
+    """One regular expression matching a path against any of the patterns"""
+    regexes = [glob_to_regex(pattern) for pattern in patterns if pattern]
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes))
+
+
+def parse_gitattributes(text: str) -> List[Tuple[Pattern, dict]]:
+    """Rules from a .gitattributes file that set or unset Linguist attributes"""
+    rules = []
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or parts[0].startswith("#"):
+            continue
+
+        values = {}
+        for attribute in parts[1:]:
+            value = True
+            if attribute.startswith(("-", "!")):
+                attribute, value = attribute[1:], False
+            elif "=" in attribute:
+                attribute, _, setting = attribute.partition("=")
+                value = setting.lower() not in ("false", "0")
+            if attribute in LINGUIST_ATTRIBUTES:
+                values[attribute] = value
+
+        if values:
+            rules.append((re.compile(glob_to_regex(parts[0])), values))
+    return rules
+
+
+def looks_binary(data: bytes) -> bool:
+    """git's test: a NUL byte near the start of the file"""
+    return b"\0" in data[:BINARY_SNIFF_BYTES]
+
+
+class FileFilter:
+    """Decides from a path (and size) whether a file is documented
+
+    Call it with a path to use it wherever an include callable is taken.
+    Paths must match an include glob and no exclude glob, and must not be
+    marked linguist-generated or linguist-vendored. Marking a file
+    linguist-vendored=false or linguist-generated=false brings it back
+    from the default excludes.
+    """
+
+    def __init__(
+        self,
+        include: Iterable[str] = DEFAULT_INCLUDE,
+        exclude: Iterable[str] = (),
+        default_excludes: bool = True,
+        attributes: Iterable[Tuple[Pattern, dict]] = (),
+        max_file_size: int = MAX_FILE_SIZE,
+    ):
+        self.include = compile_globs(include)
+        self.exclude = compile_globs(exclude)
+        self.default_exclude = (
+            compile_globs(DEFAULT_EXCLUDE) if default_excludes else None
+        )
+        # Last matching rule wins, as in git
+        self.attributes = list(attributes)[::-1]
+        self.max_file_size = max_file_size
+
+    def __call__(self, path: str) -> bool:
+        if self.include is None or not self.include.fullmatch(path):
+            return False
+        if self.exclude is not None and self.exclude.fullmatch(path):
+            return False
+
+        linguist = self._linguist(path)
+        if any(linguist.values()):
+            return False
+        if self.default_exclude is not None and self.default_exclude.fullmatch(path):
+            # Explicitly not vendored or generated overrides the defaults
+            return bool(linguist)
+        return True
+
+    def allows(self, path: str, size: int) -> bool:
+        return size <= self.max_file_size and self(path)
+
+    def _linguist(self, path: str) -> dict:
+        values = {}
+        for pattern, rule in self.attributes:
+            if pattern.fullmatch(path):
+                for attribute, value in rule.items():
+                    values.setdefault(attribute, value)
+                if len(values) == len(LINGUIST_ATTRIBUTES):
+                    break
+        return values
+
+
+def _globs(config: dict, key: str, default: Iterable[str]) -> Iterable[str]:
+    value = config.get(key, default)
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, (list, tuple)) or not all(
+        isinstance(pattern, str) for pattern in value
+    ):
+        raise ValueError(f"{key} must be a list of globs")
+    return value
+
+
+def load_file_filter(read_file: Callable[[str], Optional[str]]) -> FileFilter:
+    """Build a FileFilter from a repository's .intellidocs.yml and .gitattributes
+
+    read_file returns a root-level file's text, or None when it is missing.
+    A config that cannot be used is reported and the defaults apply instead.
+    """
+    try:
+        attributes = parse_gitattributes(read_file(ATTRIBUTES_FILE) or "")
+    except Exception as e:
+        print(f"⚠️  Could not read {ATTRIBUTES_FILE}: {e}")
+        attributes = []
+
+    try:
+        config = yaml.safe_load(read_file(CONFIG_FILE) or "") or {}
+        if not isinstance(config, dict):
+            raise ValueError("expected a mapping at the top level")
+        file_filter = FileFilter(
+            _globs(config, "include", DEFAULT_INCLUDE),
+            _globs(config, "exclude", ()),
+            default_excludes=bool(config.get("default_excludes", True)),
+            attributes=attributes,
+            max_file_size=int(config.get("max_file_size", MAX_FILE_SIZE)),
+        )
+    except Exception as e:
+        print(f"⚠️  Ignoring {CONFIG_FILE}: {e}")
+        return FileFilter(attributes=attributes)
+
+    if config:
+        print(f"⚙️  Using source selection from {CONFIG_FILE}")
+    return file_filter
+
+
+def fetch_file_filter(repo, ref: str) -> FileFilter:
+    """load_file_filter through the GitHub API; one request when neither file exists"""
+    try:
+        root = repo.get_git_tree(ref)
+    except Exception as e:
+        print(f"⚠️  Could not list repository root, using default file filter: {e}")
+        return FileFilter()
+
+    blobs = {
+        element.path: element.sha
+        for element in root.tree
+        if element.type == "blob" and element.path in FILTER_CONFIG_FILES
+    }
+
+    def read_file(path: str) -> Optional[str]:
+        if path not in blobs:
+            return None
+        blob = repo.get_git_blob(blobs[path])
+        return base64.b64decode(blob.content).decode("utf-8")
+
+    return load_file_filter(read_file)
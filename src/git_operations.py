@@ -2,12 +2,58 @@ import os
 import tempfile
 import shutil
 from git import Repo
-from github import GithubException
+from github import GithubException, InputGitTreeElement, UnknownObjectException
+from src.metrics import DOCS_WRITES_SKIPPED
+from src.mirror_cache import get_mirror_cache
+from src.tree_index import TreeIndex, git_blob_sha
+
+# Files from main that are never mirrored onto the docs branch
+SYNC_EXCLUDED_FILES = {
+    "README.md",
+    "LICENSE",
+    ".gitignore",
+    "requirements.txt",
+    "package.json",
+    "Dockerfile",
+}
+
+
+def is_synced_source(path):
+    """Check whether a path from main is mirrored onto the docs branch"""
+    if path.startswith("docs/") or path in SYNC_EXCLUDED_FILES or path.endswith(".md"):
+        return False
+    # Hidden directories are not synced
+    return not any(part.startswith(".") for part in path.split("/")[:-1])
+
+
+def is_unchanged(entry, content):
+    """Check whether a docs tree entry already holds exactly this text"""
+    return entry is not None and entry.sha == git_blob_sha(content.encode("utf-8"))
+
+
+def report_skipped_writes(skipped):
+    if skipped:
+        DOCS_WRITES_SKIPPED.inc(skipped)
+        print(f"⏭️  Skipped {skipped} unchanged files")
+
+
+class PreparedCommit:
+    """Everything an atomic docs commit reads before it writes"""
+
+    def __init__(self, main_commit, main_files, docs_sha, parent, docs_files):
+        self.main_commit = main_commit
+        self.main_files = main_files
+        # Head of the docs branch when read, or None if it did not exist
+        self.docs_sha = docs_sha
+        self.parent = parent
+        self.docs_files = docs_files
 
 
 class GitOperations:
     def __init__(self):
-        pass
+        # Atomic mode writes the whole docs update as one commit via the Git Data API
+        self.atomic_commits = os.getenv("DOCS_ATOMIC_COMMITS", "true").lower() == "true"
+        self.max_ref_retries = 3
 
     async def commit_docs_to_repository(
         self, github_client, repo_owner, repo_name, docs_content, commit_message
@@ -87,9 +133,141 @@ class GitOperations:
                 print(f"❌ Failed to create/update {doc_path}: {e}")
                 continue
 
-    async def commit_docs_to_branch(self, repo_client, docs_content, commit_message):
+    def get_latest_main_sha(self, repo_client):
+        """Get the head commit SHA of main, falling back to master"""
+        try:
+            return repo_client.get_branch("main").commit.sha
+        except:
+            try:
+                return repo_client.get_branch("master").commit.sha
+            except:
+                # Use the latest commit
+                return repo_client.get_commits()[0].sha
+
+    def prepare_atomic_commit(self, repo_client):
+        """Read main and the docs branch ahead of commit_docs_atomically
+
+        Can run while the documentation is still being generated; the commit
+        then only checks that the docs branch has not moved before writing.
+        """
+        main_commit = repo_client.get_git_commit(self.get_latest_main_sha(repo_client))
+        main_files = TreeIndex.fetch(repo_client, main_commit.tree.sha).entries
+        try:
+            docs_sha = repo_client.get_git_ref("heads/docs").object.sha
+        except UnknownObjectException:
+            return PreparedCommit(
+                main_commit, main_files, None, main_commit, main_files
+            )
+
+        parent = repo_client.get_git_commit(docs_sha)
+        docs_files = TreeIndex.fetch(repo_client, parent.tree.sha).entries
+        return PreparedCommit(main_commit, main_files, docs_sha, parent, docs_files)
+
+    async def commit_docs_atomically(
+        self, repo_client, docs_content, commit_message, prepared=None
+    ):
+        """Sync source files and write documentation to the docs branch in one commit"""
+        if prepared is None:
+            main_commit = repo_client.get_git_commit(
+                self.get_latest_main_sha(repo_client)
+            )
+            main_files = TreeIndex.fetch(repo_client, main_commit.tree.sha).entries
+        else:
+            main_commit, main_files = prepared.main_commit, prepared.main_files
+
+        for attempt in range(1, self.max_ref_retries + 1):
+            docs_files = None
+            try:
+                docs_ref = repo_client.get_git_ref("heads/docs")
+                if prepared is not None and docs_ref.object.sha == prepared.docs_sha:
+                    parent, docs_files = prepared.parent, prepared.docs_files
+                else:
+                    parent = repo_client.get_git_commit(docs_ref.object.sha)
+                print("📝 Using existing docs branch")
+            except UnknownObjectException:
+                # New docs branch starts from the latest main commit
+                docs_ref = None
+                parent, docs_files = main_commit, main_files
+                print("📝 Docs branch doesn't exist - will create it from main")
+
+            if docs_files is None:
+                docs_files = TreeIndex.fetch(repo_client, parent.tree.sha).entries
+            elements = []
+            skipped = 0
+
+            # Source files are already blobs in this repository, so reference them by SHA
+            for path, element in main_files.items():
+                if not is_synced_source(path):
+                    continue
+                existing = docs_files.get(path)
+                if existing is None or existing.sha != element.sha:
+                    elements.append(
+                        InputGitTreeElement(path, element.mode, "blob", sha=element.sha)
+                    )
+                else:
+                    skipped += 1
+
+            # Remove source files that no longer exist in main (documentation is kept)
+            for path, element in docs_files.items():
+                if is_synced_source(path) and path not in main_files:
+                    elements.append(
+                        InputGitTreeElement(path, element.mode, "blob", sha=None)
+                    )
+
+            for doc_path, content in docs_content.items():
+                if content is None:
+                    # None marks a page that is no longer generated
+                    if doc_path in docs_files:
+                        elements.append(
+                            InputGitTreeElement(doc_path, "100644", "blob", sha=None)
+                        )
+                    continue
+                if is_unchanged(docs_files.get(doc_path), content):
+                    skipped += 1
+                    continue
+                elements.append(
+                    InputGitTreeElement(doc_path, "100644", "blob", content=content)
+                )
+
+            if docs_ref is not None and not elements:
+                report_skipped_writes(skipped)
+                print("✅ Docs branch already up to date - nothing to commit")
+                return parent
+
+            tree = repo_client.create_git_tree(elements, parent.tree)
+            commit = repo_client.create_git_commit(commit_message, tree, [parent])
+
+            try:
+                if docs_ref is None:
+                    repo_client.create_git_ref(ref="refs/heads/docs", sha=commit.sha)
+                else:
+                    # Fast-forward only, so a concurrent writer is never overwritten
+                    docs_ref.edit(commit.sha)
+            except GithubException as e:
+                if e.status == 422 and attempt < self.max_ref_retries:
+                    print(f"🔄 Docs branch moved during commit - retrying ({attempt})")
+                    continue
+                raise
+
+            report_skipped_writes(skipped)
+            print(
+                f"✅ Committed {len(elements)} changes to docs branch in {commit.sha[:7]}"
+            )
+            return commit
+
+    async def commit_docs_to_branch(
+        self, repo_client, docs_content, commit_message, prepared=None
+    ):
         """Create or update documentation in a docs branch of the same repository"""
+        if self.atomic_commits:
+            return await self.commit_docs_atomically(
+                repo_client, docs_content, commit_message, prepared
+            )
+
         try:
+            docs_files = {}
+            skipped = 0
+
             # Check if docs branch exists
             docs_branch_exists = False
             try:
@@ -103,17 +281,7 @@ class GitOperations:
             # Always sync docs branch with main branch first
             try:
                 # Get the latest commit from main branch
-                try:
-                    main_branch = repo_client.get_branch("main")
-                    latest_main_sha = main_branch.commit.sha
-                except:
-                    try:
-                        master_branch = repo_client.get_branch("master")
-                        latest_main_sha = master_branch.commit.sha
-                    except:
-                        # Use the latest commit
-                        commits = repo_client.get_commits()
-                        latest_main_sha = commits[0].sha
+                latest_main_sha = self.get_latest_main_sha(repo_client)
 
                 if not docs_branch_exists:
                     # Create the docs branch from latest main
@@ -130,63 +298,26 @@ class GitOperations:
                     # Sync source files with main branch (keep docs branch updated with latest source)
                 print("🔄 Syncing source files with main branch...")
                 try:
-                    # Get all files in the docs branch
-                    docs_contents = repo_client.get_contents("", ref="docs")
-
-                    # Get all files in main branch
-                    main_contents = repo_client.get_contents("", ref="main")
-
-                    def collect_all_files(contents, path_prefix=""):
-                        files = {}
-                        for content in contents:
-                            if content.type == "file":
-                                files[content.path] = content
-                            elif content.type == "dir" and not content.name.startswith(
-                                "."
-                            ):
-                                try:
-                                    sub_contents = repo_client.get_contents(
-                                        content.path,
-                                        ref=(
-                                            content.ref
-                                            if hasattr(content, "ref")
-                                            else "main"
-                                        ),
-                                    )
-                                    files.update(
-                                        collect_all_files(
-                                            sub_contents, content.path + "/"
-                                        )
-                                    )
-                                except:
-                                    pass
-                        return files
-
-                    # Get file maps
-                    docs_files = collect_all_files(docs_contents)
-                    main_files = collect_all_files(main_contents)
+                    # Index both branches with one recursive tree listing each
+                    docs_files = TreeIndex.fetch(repo_client, "docs").entries
+                    main_files = TreeIndex.fetch(repo_client, latest_main_sha).entries
 
                     # Update/add source files that exist in main
-                    for main_path, main_content in main_files.items():
+                    for main_path in main_files:
                         # Skip documentation files and config files
-                        if (
-                            main_path.startswith("docs/")
-                            or main_path
-                            in [
-                                "README.md",
-                                "LICENSE",
-                                ".gitignore",
-                                "requirements.txt",
-                                "package.json",
-                                "Dockerfile",
-                            ]
-                            or main_path.endswith(".md")
-                        ):
+                        if not is_synced_source(main_path):
+                            continue
+
+                        docs_file = docs_files.get(main_path)
+                        if docs_file and docs_file.sha == main_files[main_path].sha:
+                            skipped += 1
                             continue
 
                         try:
                             # Get file content from main
-                            main_file = repo_client.get_contents(main_path, ref="main")
+                            main_file = repo_client.get_contents(
+                                main_path, ref=latest_main_sha
+                            )
                             file_content = main_file.decoded_content.decode("utf-8")
 
                             if main_path in docs_files:
@@ -237,20 +368,7 @@ class GitOperations:
 
                     # Remove source files from docs that no longer exist in main (but keep their documentation)
                     for docs_path, docs_file in docs_files.items():
-                        if (
-                            not docs_path.startswith("docs/")
-                            and docs_path
-                            not in [
-                                "README.md",
-                                "LICENSE",
-                                ".gitignore",
-                                "requirements.txt",
-                                "package.json",
-                                "Dockerfile",
-                            ]
-                            and not docs_path.endswith(".md")
-                            and docs_path not in main_files
-                        ):
+                        if is_synced_source(docs_path) and docs_path not in main_files:
                             try:
                                 repo_client.delete_file(
                                     docs_path,
@@ -267,6 +385,27 @@ class GitOperations:
 
                 # Now add/update documentation files in the docs branch
                 for doc_path, content in docs_content.items():
+                    if content is None:
+                        # None marks a page that is no longer generated
+                        try:
+                            existing_file = repo_client.get_contents(
+                                doc_path, ref="docs"
+                            )
+                            repo_client.delete_file(
+                                doc_path,
+                                f"docs: Remove {doc_path}",
+                                existing_file.sha,
+                                branch="docs",
+                            )
+                            print(f"🗑️  Removed: {doc_path}")
+                        except Exception as e:
+                            print(f"⚠️  Could not remove {doc_path}: {e}")
+                        continue
+
+                    if is_unchanged(docs_files.get(doc_path), content):
+                        skipped += 1
+                        continue
+
                     try:
                         # Try to get existing file in docs branch
                         try:
@@ -300,6 +439,7 @@ class GitOperations:
                 print(f"❌ Failed to sync docs branch: {e}")
                 raise
 
+            report_skipped_writes(skipped)
             print(f"✅ Successfully updated docs branch with {len(docs_content)} files")
 
         except Exception as e:
@@ -310,7 +450,13 @@ class GitOperations:
         """Fallback method to create docs branch in same repository"""
         with tempfile.TemporaryDirectory() as temp_dir:
             clone_url = repo_client.clone_url
-            repo = Repo.clone_from(clone_url, temp_dir)
+            mirror_path = get_mirror_cache().mirror_path(repo_client.full_name)
+            if os.path.isdir(mirror_path):
+                # Borrow objects from the local mirror instead of a full clone
+                repo = Repo.clone_from(mirror_path, temp_dir, shared=True)
+                repo.remotes.origin.set_url(clone_url)
+            else:
+                repo = Repo.clone_from(clone_url, temp_dir)
 
             try:
                 docs_branch = repo.heads.docs
@@ -0,0 +1,101 @@
+"""
+Application-lifetime HTTP clients with keep-alive connection pools
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from github import Auth, Github
+
+from src.metrics import record_cache_lookup
+from src.rate_limit import get_rate_limiter, install_rate_limiter
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+GITHUB_CLIENT_CACHE_SIZE = int(os.getenv("GITHUB_CLIENT_CACHE_SIZE", "32"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Shared session for raw requests (token exchange, archive downloads)"""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+            )
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+class InstallationTokenAuth(Auth.Auth):
+    """PyGithub auth that presents the current cached installation token
+
+    PyGithub reads the token on every request, so a long-lived client keeps
+    working across hourly token refreshes.
+    """
+
+    def __init__(self, app_auth, installation_id: int):
+        self.app_auth = app_auth
+        self.installation_id = installation_id
+
+    @property
+    def token_type(self) -> str:
+        return "token"
+
+    @property
+    def token(self) -> str:
+        return self.app_auth.get_installation_access_token(self.installation_id)
+
+
+class GithubClientRegistry:
+    """Pooled PyGithub clients per installation, least recently used evicted
+
+    A PyGithub client must not be shared between threads, so each worker
+    thread gets its own client for an installation and reuses it across jobs.
+    """
+
+    def __init__(self, max_clients: int = GITHUB_CLIENT_CACHE_SIZE):
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, app_auth, installation_id: int) -> Github:
+        key = (int(installation_id), threading.get_ident())
+
+        with self._lock:
+            client = self._clients.get(key)
+            record_cache_lookup("github_client", client is not None)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = Github(
+                auth=InstallationTokenAuth(app_auth, int(installation_id)),
+                base_url=GITHUB_API_URL,
+                pool_size=HTTP_POOL_SIZE,
+            )
+            # Clients on every thread share the installation's budget
+            install_rate_limiter(client, get_rate_limiter(installation_id))
+            self._clients[key] = client
+
+            # Evicted clients are not closed here since their thread may still
+            # be using them; their pools are released once they are dropped
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+
+            return client
+
+
+_registry = GithubClientRegistry()
+
+
+def get_github_client(app_auth, installation_id: int) -> Github:
+    return _registry.get(app_auth, installation_id)
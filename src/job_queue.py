@@ -0,0 +1,438 @@
+"""
+Durable SQLite-backed job queue and the worker pool that drains it
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.metrics import JOBS
+
+
+def worker_identity() -> str:
+    """Name of this process among every instance sharing the job store"""
+    machine = (
+        os.getenv("WORKER_ID") or os.getenv("FLY_MACHINE_ID") or socket.gethostname()
+    )
+    return f"{machine}:{os.getpid()}"
+
+
+class Job:
+    def __init__(
+        self,
+        job_id: int,
+        kind: str,
+        payload: Dict[str, Any],
+        attempts: int,
+        owner: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+        claimed_at: Optional[float] = None,
+    ):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.owner = owner
+        self.coalesce_key = coalesce_key
+        self.claimed_at = claimed_at
+
+
+class JobQueue:
+    """At-least-once job queue that survives process restarts
+
+    A claimed job is held for lease_seconds and stays invisible to other
+    workers while its worker keeps renewing it with heartbeat(), up to
+    visibility_timeout in total; if the worker dies, the job is claimed again
+    once the lease lapses. Failed jobs are retried with exponential backoff
+    until max_attempts is reached, after which they are kept as "dead".
+
+    Jobs that share a coalesce_key (the repository) never run at the same
+    time: claiming one takes the key's lease, and no other worker can claim
+    a job for that key until the lease is released or expires. Any number of
+    processes can share one database file, which is how several app
+    instances split the work while each repository has a single writer.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: float = 1800,
+        max_attempts: int = 5,
+        retry_backoff: float = 30,
+        lease_seconds: float = 60,
+    ):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = min(lease_seconds, visibility_timeout)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                claimed_until REAL,
+                created_at REAL NOT NULL,
+                last_error TEXT,
+                coalesce_key TEXT
+            )
+            """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (
+            ("coalesce_key", "TEXT"),
+            ("claimed_by", "TEXT"),
+            ("claimed_at", "REAL"),
+        ):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                job_id INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_coalesce ON jobs (coalesce_key, status)"
+        )
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        delay: float = 0,
+        coalesce_key: Optional[str] = None,
+        merge: Optional[
+            Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+        ] = None,
+        max_delay: Optional[float] = None,
+    ) -> int:
+        """Add a job, or fold it into a queued job with the same coalesce_key
+
+        When folding, the queued payload is replaced by merge(old, new) and
+        its start is pushed back by delay, but never beyond max_delay after
+        the queued job was first created. A job waiting out a retry backoff
+        starts over as new work: its attempts and creation time are reset,
+        and it still waits until its backoff ends.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = None
+                if coalesce_key is not None:
+                    row = self._conn.execute(
+                        "SELECT id, payload, created_at, attempts, available_at "
+                        "FROM jobs "
+                        "WHERE coalesce_key = ? AND status = 'queued' "
+                        "ORDER BY id LIMIT 1",
+                        (coalesce_key,),
+                    ).fetchone()
+
+                if row is None:
+                    cursor = self._conn.execute(
+                        "INSERT INTO jobs "
+                        "(kind, payload, available_at, created_at, coalesce_key) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (kind, json.dumps(payload), now + delay, now, coalesce_key),
+                    )
+                    job_id = cursor.lastrowid
+                else:
+                    job_id, queued_payload, created_at, attempts, backoff_until = row
+                    if merge is not None:
+                        payload = merge(json.loads(queued_payload), payload)
+                    if attempts:
+                        # Otherwise it would inherit the failed attempts and
+                        # skip the rest of its backoff
+                        created_at = now
+                    available_at = now + delay
+                    if max_delay is not None:
+                        available_at = min(available_at, created_at + max_delay)
+                    if attempts:
+                        available_at = max(available_at, backoff_until)
+                    self._conn.execute(
+                        "UPDATE jobs SET payload = ?, available_at = ?, "
+                        "created_at = ?, attempts = 0 WHERE id = ?",
+                        (json.dumps(payload), available_at, created_at, job_id),
+                    )
+                    print(f"🔗 Coalesced job into queued job {job_id}")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return job_id
+
+    def claim(self, owner: Optional[str] = None) -> Optional[Job]:
+        """Take the oldest runnable job, including ones whose worker went away
+
+        The job and its repository's lease are held by owner until
+        complete(), fail() or the lease running out.
+        """
+        owner = owner or worker_identity()
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker kept dying have used up their attempts
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'dead', "
+                    "last_error = 'visibility timeout expired' "
+                    "WHERE status = 'running' AND claimed_until < ? AND attempts >= ?",
+                    (now, self.max_attempts),
+                )
+                self._conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+                row = self._conn.execute(
+                    """
+                    SELECT id, kind, payload, attempts, coalesce_key
+                    FROM jobs AS candidate
+                    WHERE attempts < ? AND (
+                        (status = 'queued' AND available_at <= ?)
+                        OR (status = 'running' AND claimed_until < ?)
+                    )
+                    AND NOT EXISTS (
+                        SELECT 1 FROM leases WHERE key = candidate.coalesce_key
+                    )
+                    ORDER BY available_at, id
+                    LIMIT 1
+                    """,
+                    (self.max_attempts, now, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                job_id, kind, payload, attempts, coalesce_key = row
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', claimed_until = ?, "
+                    "claimed_by = ?, claimed_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (now + self.lease_seconds, owner, now, job_id),
+                )
+                if coalesce_key is not None:
+                    self._conn.execute(
+                        "INSERT INTO leases (key, owner, job_id, expires_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (coalesce_key, owner, job_id, now + self.lease_seconds),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return Job(
+            job_id, kind, json.loads(payload), attempts + 1, owner, coalesce_key, now
+        )
+
+    def heartbeat(self, job: Job) -> bool:
+        """Renew a claimed job's lease; False once another worker may hold it"""
+        now = time.time()
+        expires_at = min(
+            now + self.lease_seconds, job.claimed_at + self.visibility_timeout
+        )
+        if expires_at < now:
+            # Ran past its visibility timeout; let another worker retry it
+            return False
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                held = self._conn.execute(
+                    "UPDATE jobs SET claimed_until = ? "
+                    "WHERE id = ? AND claimed_by = ? AND status = 'running'",
+                    (expires_at, job.id, job.owner),
+                ).rowcount
+                if held and job.coalesce_key is not None:
+                    held = self._conn.execute(
+                        "UPDATE leases SET expires_at = ? "
+                        "WHERE key = ? AND owner = ? AND job_id = ?",
+                        (expires_at, job.coalesce_key, job.owner, job.id),
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return bool(held)
+
+    def _release(self, job_id: int, owner: Optional[str]) -> None:
+        self._conn.execute(
+            "DELETE FROM leases WHERE job_id = ? AND (owner = ? OR ? IS NULL)",
+            (job_id, owner, owner),
+        )
+
+    def complete(self, job_id: int, owner: Optional[str] = None) -> None:
+        """Remove a finished job, unless it has since been claimed by someone else"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._conn.execute(
+                    "DELETE FROM jobs WHERE id = ? AND (claimed_by = ? OR ? IS NULL)",
+                    (job_id, owner, owner),
+                ).rowcount
+                self._release(job_id, owner)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if not deleted:
+            print(f"⚠️  Job {job_id} was taken over by another worker before finishing")
+
+    def fail(self, job_id: int, error: str, owner: Optional[str] = None) -> None:
+        """Schedule a retry with exponential backoff, or bury the job"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts FROM jobs "
+                    "WHERE id = ? AND (claimed_by = ? OR ? IS NULL)",
+                    (job_id, owner, owner),
+                ).fetchone()
+                if row is not None:
+                    self._fail(job_id, row[0], error)
+                self._release(job_id, owner)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _fail(self, job_id: int, attempts: int, error: str) -> None:
+        if attempts >= self.max_attempts:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'dead', last_error = ? WHERE id = ?",
+                (error, job_id),
+            )
+            return
+
+        delay = self.retry_backoff * (2 ** (attempts - 1))
+        self._conn.execute(
+            "UPDATE jobs SET status = 'queued', available_at = ?, "
+            "claimed_until = NULL, claimed_by = NULL, last_error = ? WHERE id = ?",
+            (time.time() + delay, error, job_id),
+        )
+
+    def depth(self) -> int:
+        """Number of jobs waiting to run"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+
+
+class WorkerPool:
+    """Threads that claim jobs from a JobQueue and run an async handler
+
+    A heartbeat thread renews the lease of every running job a third of the
+    way through it, so a job can run for as long as it needs while a
+    crashed instance's jobs are picked up within lease_seconds.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or worker_identity()
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._running: Dict[int, Job] = {}
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                args=(f"{self.worker_id}/{number}",),
+                name=f"intellidocs-worker-{number}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        if self.workers:
+            thread = threading.Thread(
+                target=self._heartbeat, name="intellidocs-heartbeat", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        print(f"👷 Started {self.workers} workers as {self.worker_id}")
+
+    def stop(self, timeout: float = 10) -> None:
+        # Jobs still running are picked up again after their visibility timeout
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, owner: str) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(owner)
+            except Exception as e:
+                print(f"⚠️  Could not claim job: {e}")
+                job = None
+
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            self._process(job)
+
+    def _process(self, job: Job) -> None:
+        print(f"👷 Running job {job.id} ({job.kind}, attempt {job.attempts})")
+        with self._in_flight_lock:
+            self.in_flight += 1
+            self._running[job.id] = job
+        try:
+            asyncio.run(self.handler(job.payload))
+        except Exception as e:
+            print(f"❌ Job {job.id} failed: {e}")
+            JOBS.labels("failed").inc()
+            self.queue.fail(job.id, traceback.format_exc(), job.owner)
+        else:
+            JOBS.labels("succeeded").inc()
+            self.queue.complete(job.id, job.owner)
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+                self._running.pop(job.id, None)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            with self._in_flight_lock:
+                jobs = list(self._running.values())
+            for job in jobs:
+                try:
+                    if not self.queue.heartbeat(job):
+                        # The docs commit only fast-forwards, so a late writer
+                        # cannot overwrite the new owner's work
+                        print(f"⚠️  Lost the lease on job {job.id}")
+                except Exception as e:
+                    print(f"⚠️  Could not renew the lease on job {job.id}: {e}")
@@ -0,0 +1,127 @@
+"""
+Persistent content-addressed cache for LLM responses
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from src.metrics import record_cache_lookup
+from src.storage import data_path
+
+
+class LLMCache:
+    """SQLite-backed response cache with size-bounded LRU eviction"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._conn.commit()
+        self.total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def key_for(model_name: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            record_cache_lookup("llm_response", row is not None)
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until the cache fits its budget
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.total_bytes = 0
+                return
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes": self.total_bytes,
+        }
+
+
+_shared_cache: Optional[LLMCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide response cache, or None when disabled"""
+    global _shared_cache
+
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache(
+                os.getenv("LLM_CACHE_PATH") or data_path("llm_cache.sqlite3"),
+                int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            )
+        return _shared_cache
@@ -0,0 +1,117 @@
+"""
+Record of which source files fed each generated documentation page
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from github import UnknownObjectException
+
+
+def fingerprint(*values: Any) -> str:
+    """Stable hash of JSON-serialisable prompt inputs"""
+    encoded = json.dumps(values, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class DocsManifest:
+    """Per-repository manifest stored alongside the docs on the docs branch
+
+    "files" maps each documented source path to the blob SHA it had when the
+    docs were last generated. Each page lists the source paths read into its
+    prompt ("*" when it reads every file) and a fingerprint of its other
+    inputs. A page only needs regenerating when one of those changes.
+    """
+
+    PATH = "docs/.manifest.json"
+    ALL_SOURCES = "*"
+
+    def __init__(
+        self,
+        files: Dict[str, str] = None,
+        pages: Dict[str, Dict[str, Any]] = None,
+    ):
+        self.files = files or {}
+        self.pages = pages or {}
+        self.removed_pages: List[str] = []
+
+    @classmethod
+    def load(cls, repo, ref: str = "docs") -> "DocsManifest":
+        """Read the manifest from the docs branch, or start an empty one"""
+        try:
+            content_file = repo.get_contents(cls.PATH, ref=ref)
+        except UnknownObjectException:
+            return cls()
+
+        if content_file.encoding == "base64" and content_file.content:
+            raw = content_file.decoded_content
+        else:
+            # The contents API omits bodies over 1 MB; the blobs API does not
+            raw = base64.b64decode(repo.get_git_blob(content_file.sha).content)
+
+        data = json.loads(raw)
+        return cls(data.get("files", {}), data.get("pages", {}))
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"version": 1, "files": self.files, "pages": self.pages},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+
+    def _sources_spec(self, sources: List[str], blob_shas: Dict[str, str]):
+        if sources and len(sources) == len(blob_shas):
+            return self.ALL_SOURCES
+        return sorted(sources)
+
+    def _is_stale(self, page, section, spec, blob_shas: Dict[str, str]) -> bool:
+        if page is None or page.get("context") != section.context:
+            return True
+        if page.get("sources") != spec:
+            return True
+
+        if spec == self.ALL_SOURCES:
+            return self.files != blob_shas
+        return any(self.files.get(path) != blob_shas.get(path) for path in spec)
+
+    def is_stale(self, section: Any, blob_shas: Dict[str, str]) -> Optional[bool]:
+        """Whether one page needs regenerating, judged from its own sources
+
+        blob_shas only needs to cover the page's sources, so this works before
+        the whole repository has been read. Returns None for pages last built
+        from every file, which cannot be judged until all files are known.
+        """
+        page = self.pages.get(section.path)
+        if page is not None and page.get("sources") == self.ALL_SOURCES:
+            return None
+        return self._is_stale(page, section, sorted(section.sources), blob_shas)
+
+    def refresh(self, sections: List[Any], blob_shas: Dict[str, str]) -> List[Any]:
+        """Pick the sections whose inputs changed and record their new inputs
+
+        Pages that are no longer planned are dropped from the manifest and
+        listed in removed_pages.
+        """
+        stale = []
+        pages = {}
+
+        for section in sections:
+            spec = self._sources_spec(section.sources, blob_shas)
+            if self._is_stale(self.pages.get(section.path), section, spec, blob_shas):
+                stale.append(section)
+            pages[section.path] = {"sources": spec, "context": section.context}
+
+        self.removed_pages = [path for path in self.pages if path not in pages]
+        self.files = dict(blob_shas)
+        self.pages = pages
+        return stale
+
+    def forget(self, paths: List[str]) -> None:
+        """Drop pages whose content should not count as up to date
+
+        They are planned again next time, find no entry and are regenerated.
+        """
+        for path in paths:
+            self.pages.pop(path, None)
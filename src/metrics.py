@@ -0,0 +1,138 @@
+"""
+Prometheus metrics for webhook handling, the job pipeline and its backends
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.tracing import span
+
+# Stages of a push job, in the order they run
+PIPELINE_STAGES = ("discover", "fetch", "analyze", "generate", "commit")
+
+# Remote calls take from milliseconds to minutes (archive downloads, LLMs)
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+WEBHOOK_ACK_SECONDS = Histogram(
+    "intellidocs_webhook_ack_seconds",
+    "Time from receiving a webhook to acknowledging it",
+    ["status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+QUEUE_DEPTH = Gauge("intellidocs_queue_depth", "Jobs waiting to run")
+IN_FLIGHT_JOBS = Gauge("intellidocs_in_flight_jobs", "Jobs currently running")
+JOBS = Counter("intellidocs_jobs_total", "Jobs finished by workers", ["result"])
+STAGE_SECONDS = Histogram(
+    "intellidocs_stage_seconds",
+    "Time spent in each stage of a push job",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+GITHUB_REQUESTS = Counter(
+    "intellidocs_github_requests_total",
+    "GitHub API requests",
+    ["method", "endpoint", "status"],
+)
+GITHUB_REQUEST_SECONDS = Histogram(
+    "intellidocs_github_request_seconds",
+    "GitHub API request latency, including time waiting on the rate limit",
+    ["method", "endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+GITHUB_RATE_LIMIT_REMAINING = Gauge(
+    "intellidocs_github_rate_limit_remaining",
+    "Core API requests left in the current window, from X-RateLimit-Remaining",
+    ["installation"],
+)
+GEMINI_REQUESTS = Counter(
+    "intellidocs_gemini_requests_total",
+    "Gemini generate_content calls",
+    ["section", "result"],
+)
+GEMINI_PROMPT_TOKENS = Histogram(
+    "intellidocs_gemini_prompt_tokens",
+    "Estimated tokens in each prompt sent to Gemini",
+    ["section"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+)
+GEMINI_REQUEST_SECONDS = Histogram(
+    "intellidocs_gemini_request_seconds",
+    "Gemini generate_content latency",
+    ["section"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_LOOKUPS = Counter(
+    "intellidocs_cache_lookups_total",
+    "Cache lookups; hit ratio is hits over all lookups",
+    ["cache", "result"],
+)
+BYTES_FETCHED = Counter(
+    "intellidocs_bytes_fetched_total",
+    "Bytes downloaded from GitHub",
+    ["source"],
+)
+DOCS_WRITES_SKIPPED = Counter(
+    "intellidocs_docs_writes_skipped_total",
+    "Docs branch writes skipped because the file was already up to date",
+)
+
+for _stage in PIPELINE_STAGES:
+    STAGE_SECONDS.labels(_stage)
+
+_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Record how long the enclosed block of a push job took, and trace it"""
+    started = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def github_endpoint(url: str) -> str:
+    """Collapse a request URL to a low-cardinality endpoint label
+
+    /repos/o/r/git/blobs/<sha> becomes "repos/git/blobs" and
+    /repos/o/r/contents/src/app.py becomes "repos/contents".
+    """
+    path = url.split("?", 1)[0]
+    segments = [segment for segment in path.split("/") if segment]
+
+    # GitHub Enterprise serves the API under a prefix such as /api/v3
+    if "repos" in segments:
+        rest = segments[segments.index("repos") + 3 :]
+        if rest[:1] == ["git"]:
+            rest = rest[:2]
+        else:
+            rest = rest[:1]
+        return "/".join(["repos"] + rest)
+
+    return "/".join(
+        ":id" if segment.isdigit() or _SHA.match(segment) else segment
+        for segment in segments
+    )
+
+
+def gemini_section(section: str) -> str:
+    """Collapse a prompt's section name to a low-cardinality label"""
+    if section.startswith("summary:module:"):
+        return "module_summary"
+    if section.startswith("summary:"):
+        return "file_summary"
+    if section.startswith("docs/modules/"):
+        return "module"
+    return section or "other"
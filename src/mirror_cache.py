@@ -0,0 +1,235 @@
+"""
+On-disk cache of bare repository mirrors for reading source locally
+"""
+
+import base64
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from git import GitCommandError, Repo
+
+from src.file_filter import MAX_FILE_SIZE, looks_binary
+from src.metrics import BYTES_FETCHED, record_cache_lookup
+from src.storage import data_path
+from src.tracing import span
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                continue
+    return total
+
+
+class MirrorCache:
+    """Bare mirrors keyed by repository, evicted whole in LRU order
+
+    The first use of a repository clones it; later pushes only fetch the new
+    objects, and files are read from the object database without a checkout.
+    The installation token is supplied on each fetch and never stored.
+    """
+
+    LAST_USED_FILE = "intellidocs-last-used"
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fetches = 0
+        self.evictions = 0
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._locks_lock:
+            if name not in self._locks:
+                self._locks[name] = threading.Lock()
+            return self._locks[name]
+
+    def mirror_path(self, repo_full_name: str) -> str:
+        return os.path.join(self.root, repo_full_name.replace("/", "__") + ".git")
+
+    @staticmethod
+    def _auth_environment(token: str) -> Dict[str, str]:
+        # Passed as config through the environment so the token stays out of
+        # the command line, error messages and the mirror's config file
+        credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        return {
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.extraHeader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+            "GIT_TERMINAL_PROMPT": "0",
+        }
+
+    def _touch(self, path: str) -> None:
+        with open(os.path.join(path, self.LAST_USED_FILE), "w") as marker:
+            marker.write(str(time.time()))
+
+    def _last_used(self, path: str) -> float:
+        try:
+            with open(os.path.join(path, self.LAST_USED_FILE)) as marker:
+                return float(marker.read())
+        except (OSError, ValueError):
+            return 0.0
+
+    def update(self, repo_full_name: str, clone_url: str, token: str, sha: str) -> str:
+        """Fetch new objects into the mirror and return its path"""
+        path = self.mirror_path(repo_full_name)
+
+        with self._lock_for(repo_full_name):
+            existing = os.path.isdir(path)
+            record_cache_lookup("mirror", existing)
+            if existing:
+                repo = Repo(path)
+                print(f"🔄 Fetching {repo_full_name} into existing mirror")
+            else:
+                repo = Repo.init(path, bare=True)
+                print(f"🪞 Creating mirror for {repo_full_name}")
+
+            if existing:
+                try:
+                    repo.git.cat_file("-e", f"{sha}^{{commit}}")
+                    print(f"🪞 {sha[:7]} already in mirror - skipping fetch")
+                    repo.close()
+                    self._touch(path)
+                    return path
+                except GitCommandError:
+                    pass
+
+            objects_before = _directory_size(os.path.join(path, "objects"))
+            try:
+                with span(
+                    "mirror_fetch", repo=repo_full_name, existing=existing
+                ), repo.git.custom_environment(**self._auth_environment(token)):
+                    repo.git.fetch(clone_url, "+refs/heads/*:refs/heads/*", prune=True)
+                    try:
+                        repo.git.cat_file("-e", f"{sha}^{{commit}}")
+                    except GitCommandError:
+                        # The branch moved on since the push; fetch the commit
+                        repo.git.fetch(clone_url, sha)
+                self.fetches += 1
+            finally:
+                repo.close()
+
+            # Packs arrive compressed, so their growth is what came over the wire
+            objects_after = _directory_size(os.path.join(path, "objects"))
+            BYTES_FETCHED.labels("mirror").inc(max(objects_after - objects_before, 0))
+
+            self._touch(path)
+
+        self.evict(keep=repo_full_name)
+        return path
+
+    def iter_files(
+        self,
+        repo_full_name: str,
+        sha: str,
+        include: Callable[[str], bool],
+        max_file_size: int = MAX_FILE_SIZE,
+    ) -> Iterator[Tuple[str, str]]:
+        """Stream (path, text) for matching files at sha, read from the mirror
+
+        The tree is walked depth first, so every directory's files come out
+        together, in the order git archive would list them.
+        """
+        with self._lock_for(repo_full_name):
+            repo = Repo(self.mirror_path(repo_full_name))
+            try:
+                for item in repo.commit(sha).tree.traverse(branch_first=False):
+                    if item.type != "blob" or not include(item.path):
+                        continue
+                    if item.size > max_file_size:
+                        print(
+                            f"⏭️  Skipping {item.path} - too large ({item.size} bytes)"
+                        )
+                        continue
+                    data = item.data_stream.read()
+                    if looks_binary(data):
+                        print(f"⏭️  Skipping {item.path} - binary")
+                        continue
+                    try:
+                        text = data.decode("utf-8")
+                    except UnicodeDecodeError:
+                        print(f"⏭️  Skipping {item.path} - not UTF-8 text")
+                        continue
+                    yield item.path, text
+            finally:
+                repo.close()
+
+    def read_text(self, repo_full_name: str, sha: str, path: str) -> Optional[str]:
+        """Text of one file at sha, or None if it does not exist"""
+        with self._lock_for(repo_full_name):
+            repo = Repo(self.mirror_path(repo_full_name))
+            try:
+                blob = repo.commit(sha).tree / path
+            except KeyError:
+                return None
+            else:
+                return blob.data_stream.read().decode("utf-8")
+            finally:
+                repo.close()
+
+    def read_files(
+        self,
+        repo_full_name: str,
+        sha: str,
+        include: Callable[[str], bool],
+        max_file_size: int = MAX_FILE_SIZE,
+    ) -> Dict[str, str]:
+        """Decoded text of matching files at sha, read from the mirror"""
+        return dict(self.iter_files(repo_full_name, sha, include, max_file_size))
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used mirrors until the cache fits max_bytes"""
+        mirrors = []
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if os.path.isdir(path):
+                mirrors.append((self._last_used(path), path, _directory_size(path)))
+
+        total = sum(size for _, _, size in mirrors)
+        keep_path = self.mirror_path(keep) if keep else None
+
+        for _, path, size in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+
+            name = os.path.basename(path)[: -len(".git")].replace("__", "/", 1)
+            lock = self._lock_for(name)
+            # A mirror being read or fetched right now is left alone
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                lock.release()
+
+            total -= size
+            self.evictions += 1
+            print(f"🧹 Evicted mirror {name} ({size} bytes)")
+
+
+_shared_mirrors = None
+_shared_mirrors_lock = threading.Lock()
+
+
+def get_mirror_cache() -> MirrorCache:
+    """Process-wide mirror cache"""
+    global _shared_mirrors
+
+    with _shared_mirrors_lock:
+        if _shared_mirrors is None:
+            _shared_mirrors = MirrorCache(
+                os.getenv("MIRROR_CACHE_DIR") or data_path("mirrors"),
+                int(os.getenv("MIRROR_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024))),
+            )
+        return _shared_mirrors
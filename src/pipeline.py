@@ -0,0 +1,233 @@
+"""
+Streaming docs pipeline: fetching, page generation and commit reads overlap
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.content_store import ContentStore
+from src.docs_generator import (
+    CodeContext,
+    DocSection,
+    forget_fallback_pages,
+    module_name,
+)
+from src.manifest import DocsManifest
+from src.metrics import stage_timer
+from src.summary_tree import SummaryTree
+from src.symbols import extract_symbols
+from src.tracing import in_current_context
+from src.tree_index import git_blob_sha
+
+# Items held between stages before the faster stage waits for the slower one
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+
+_DONE = object()
+
+
+class DocsPipeline:
+    """Generates pages while the repository is still being read
+
+    Files stream from the source through a bounded queue. Sources list each
+    top-level directory contiguously, so a module's page is generated as soon
+    as the first file of the next module arrives. Pages that read the whole
+    repository wait for the stream to end. Meanwhile prepare_commit runs on
+    its own thread, so the reads the commit needs are done by the time the
+    last page is.
+    """
+
+    def __init__(
+        self,
+        generator,
+        prepare_commit: Optional[Callable[[], Any]] = None,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+    ):
+        self.generator = generator
+        self.prepare_commit = prepare_commit
+        self.queue_size = queue_size
+        # What prepare_commit returned, or None if it failed
+        self.prepared_commit = None
+        self.early_pages = 0
+
+        self._stop = threading.Event()
+        self._pages: Dict[str, Future] = {}
+        self._sections: Dict[str, DocSection] = {}
+        self._contexts: Dict[str, str] = {}
+        self._completed_modules: Set[str] = set()
+        self._modules: Dict[str, List[str]] = {}
+        self._blob_shas: Dict[str, str] = {}
+        self._manifest: Optional[DocsManifest] = None
+        self._code: Optional[CodeContext] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def run(
+        self,
+        repo_name: str,
+        source: Iterable[Tuple[str, str]],
+        manifest: Optional[DocsManifest] = None,
+    ) -> Dict[str, str]:
+        """Read (path, text) pairs from source and return the pages generated
+
+        With a manifest, only pages whose inputs changed are generated and
+        the manifest is updated to match, as generate_project_documentation
+        does.
+        """
+        files = ContentStore()
+        blob_shas = self._blob_shas
+        code = self._code = CodeContext(files, {}, set())
+        if self.generator.strategy == "hierarchical" and self.generator.client:
+            code.summaries = SummaryTree(self.generator, code, self._modules)
+        self._manifest = manifest
+
+        incoming = queue.Queue(maxsize=self.queue_size)
+        fetcher = threading.Thread(
+            target=in_current_context(self._fetch),
+            args=(source, incoming),
+            name="intellidocs-fetch",
+            daemon=True,
+        )
+        preparer = threading.Thread(
+            target=in_current_context(self._prepare_commit),
+            name="intellidocs-prepare-commit",
+            daemon=True,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(self.generator.max_concurrency, 1)
+        )
+
+        fetcher.start()
+        if self.prepare_commit is not None:
+            preparer.start()
+        try:
+            current = None
+            with stage_timer("generate"):
+                while True:
+                    item = incoming.get()
+                    if item is _DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+
+                    file_path, content = item
+                    module = module_name(file_path)
+                    if module != current:
+                        if current is not None:
+                            self._module_ready(current)
+                        current = module
+
+                    files[file_path] = content
+                    code.symbols[file_path] = extract_symbols(file_path, content)
+                    blob_shas[file_path] = git_blob_sha(content.encode("utf-8"))
+                    if manifest is not None and (
+                        manifest.files.get(file_path) != blob_shas[file_path]
+                    ):
+                        code.changed.add(file_path)
+                    self._modules.setdefault(module, []).append(file_path)
+
+                if current is not None:
+                    self._module_ready(current)
+                print(f"📄 Found {len(files)} code files in entire repository")
+                if not files:
+                    return {}
+
+                with stage_timer("analyze"):
+                    sections = self.generator.plan_sections(
+                        repo_name, files, code.changed, code=code
+                    )
+                    if manifest is not None:
+                        sections = manifest.refresh(sections, blob_shas)
+                        print(
+                            f"📝 {len(sections)} documentation pages need regenerating"
+                        )
+
+                # Pages generated early are kept when their inputs did not change
+                remaining = [
+                    section
+                    for section in sections
+                    if self._contexts.get(section.path) != section.context
+                ]
+                self.generator._prepare_summaries(remaining)
+                for section in remaining:
+                    self._submit(section)
+
+                order = [section.path for section in sections]
+                order += [path for path in self._pages if path not in order]
+                docs = {path: self._pages[path].result() for path in order}
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=self._stop.is_set())
+            if self.prepare_commit is not None:
+                preparer.join()
+            files.close()
+
+        forget_fallback_pages(manifest, list(self._sections.values()))
+        print(
+            f"🚰 Pipeline generated {len(docs)} pages, {self.early_pages} of them "
+            "as soon as their module was read"
+        )
+        return docs
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        # Gives up once the pipeline is stopping so no thread blocks forever
+        while True:
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self._stop.is_set():
+                    return False
+
+    def _fetch(self, source: Iterable[Tuple[str, str]], incoming: queue.Queue) -> None:
+        try:
+            with stage_timer("fetch"):
+                for item in source:
+                    if not self._put(incoming, item):
+                        return
+        except Exception as e:
+            self._put(incoming, e)
+        finally:
+            self._put(incoming, _DONE)
+
+    def _module_ready(self, module: str) -> None:
+        """Start a module's page once all of its files have arrived"""
+        if module == "root":
+            # Git tree order puts root files between directories
+            return
+        if module in self._completed_modules:
+            # The final plan regenerates it from the complete file list
+            print(f"⚠️  Files of module {module} arrived out of order")
+        self._completed_modules.add(module)
+
+        strategy = ()
+        if self._code.summaries is not None:
+            strategy = (self.generator.strategy,)
+        section = self.generator._module_sections(
+            {"modules": {module: sorted(self._modules[module])}}, self._code, strategy
+        )[0]
+        if self._manifest is not None and not self._manifest.is_stale(
+            section, self._blob_shas
+        ):
+            # Unchanged, or only decidable once every file is known
+            return
+
+        self.early_pages += 1
+        self._submit(section)
+
+    def _submit(self, section: DocSection) -> None:
+        self._sections[section.path] = section
+        self._contexts[section.path] = section.context
+        self._pages[section.path] = self._executor.submit(
+            in_current_context(section.run)
+        )
+
+    def _prepare_commit(self) -> None:
+        try:
+            self.prepared_commit = self.prepare_commit()
+        except Exception as e:
+            # The commit reads everything itself instead
+            print(f"⚠️  Could not prepare the docs commit: {e}")
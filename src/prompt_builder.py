@@ -0,0 +1,95 @@
+"""
+Token-budgeted packing of repository context into prompts
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+
+# Rough average for source code with Gemini's tokenizer; a real count would
+# cost an API round trip per prompt
+CHARS_PER_TOKEN = 4
+
+# Lower numbers are packed first
+PRIORITY_SYMBOLS = 0
+PRIORITY_ENTRY_POINT = 1
+PRIORITY_CHANGED = 2
+PRIORITY_SOURCE = 3
+
+# A block is cut to fit only when at least this much budget is left for it
+MIN_TRUNCATED_TOKENS = 64
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PromptBlock:
+    # Either the text or a function that loads it
+    text: Union[str, Callable[[], str]]
+    priority: int
+    label: str
+    size: int
+
+    def load(self) -> str:
+        return self.text if isinstance(self.text, str) else self.text()
+
+
+class PromptBuilder:
+    """Fills a token budget with context blocks, most important first
+
+    The header (the instructions) is always included. Blocks are then added
+    in priority order, keeping insertion order within a priority, until the
+    budget runs out; the first block that does not fit is cut to the space
+    left and the rest are left out. A block given as a function is only
+    called once it makes it into the prompt, so source that does not fit is
+    never loaded.
+    """
+
+    def __init__(self, budget_tokens: int, header: str = ""):
+        self.budget_tokens = budget_tokens
+        self.header = header
+        self.blocks: List[PromptBlock] = []
+        self.included = 0
+        self.truncated = 0
+        self.omitted = 0
+        self.tokens = 0
+
+    def add(
+        self,
+        text: Union[str, Callable[[], str]],
+        priority: int = PRIORITY_SOURCE,
+        label: str = "",
+        size: Optional[int] = None,
+    ) -> None:
+        """Queue a block; size (in characters) is required when text is a function"""
+        if size is None:
+            size = len(text)
+        if size:
+            self.blocks.append(PromptBlock(text, priority, label, size))
+
+    def build(self) -> str:
+        parts = [self.header] if self.header else []
+        used = estimate_tokens(self.header)
+        self.included = self.truncated = self.omitted = 0
+
+        for block in sorted(self.blocks, key=lambda block: block.priority):
+            cost = (block.size + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN + 1
+            left = self.budget_tokens - used
+
+            if cost <= left:
+                parts.append(block.load())
+                used += cost
+                self.included += 1
+            elif left >= MIN_TRUNCATED_TOKENS:
+                marker = "\n... [truncated]"
+                keep = (left - 1) * CHARS_PER_TOKEN - len(marker)
+                parts.append(block.load()[:keep] + marker)
+                used = self.budget_tokens
+                self.truncated += 1
+            else:
+                self.omitted += 1
+
+        prompt = "\n".join(parts)
+        self.tokens = estimate_tokens(prompt)
+        return prompt
@@ -0,0 +1,79 @@
+"""
+Helpers for GitHub push event payloads
+"""
+
+import json
+from typing import Any, Dict
+from urllib.parse import unquote_to_bytes
+
+try:
+    import orjson
+except ImportError:  # Optional faster JSON backend
+    orjson = None
+
+# Only pushes to these branches are documented
+TRACKED_REFS = ("refs/heads/main", "refs/heads/master")
+
+
+def merge_push_events(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two queued pushes to the same repository into one
+
+    The result spans from the older push's "before" to the newer push's
+    "after", and its commit list covers the files changed by both.
+    """
+    merged = dict(newer)
+    merged["before"] = older["before"]
+    merged["commits"] = older.get("commits", []) + newer.get("commits", [])
+    merged["delivery_ids"] = older.get("delivery_ids", []) + newer.get(
+        "delivery_ids", []
+    )
+    merged["coalesced_pushes"] = older.get("coalesced_pushes", 1) + newer.get(
+        "coalesced_pushes", 1
+    )
+    return merged
+
+
+def parse_webhook_body(body: bytes) -> Dict[str, Any]:
+    """Decode a JSON or form-encoded ("payload=...") webhook body
+
+    Parsing works on bytes throughout, so the body is never copied into an
+    intermediate str. Raises ValueError if the body is not valid JSON.
+    """
+    if body.startswith(b"payload="):
+        # application/x-www-form-urlencoded encodes spaces as "+"
+        body = unquote_to_bytes(body[8:].replace(b"+", b" "))
+
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def compact_push_event(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the push payload fields the docs pipeline reads"""
+    repository = event_data["repository"]
+    compact = {
+        "repository": {
+            "full_name": repository["full_name"],
+            "name": repository["name"],
+        },
+        "ref": event_data["ref"],
+        "before": event_data["before"],
+        "after": event_data["after"],
+        "commits": [
+            {
+                "id": commit.get("id"),
+                # The first line is all that gets logged
+                "message": (commit.get("message") or "").split("\n", 1)[0],
+                "added": commit.get("added", []),
+                "modified": commit.get("modified", []),
+                "removed": commit.get("removed", []),
+            }
+            for commit in event_data.get("commits") or []
+        ],
+    }
+
+    installation = event_data.get("installation")
+    if installation and "id" in installation:
+        compact["installation"] = {"id": installation["id"]}
+
+    return compact
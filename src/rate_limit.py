@@ -0,0 +1,216 @@
+"""
+Per-installation pacing of GitHub REST requests against the rate limit budget
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+from src.metrics import (
+    BYTES_FETCHED,
+    GITHUB_RATE_LIMIT_REMAINING,
+    GITHUB_REQUEST_SECONDS,
+    GITHUB_REQUESTS,
+    github_endpoint,
+)
+from src.tracing import span
+
+# Requests per installation allowed back to back before pacing kicks in
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "50"))
+# Requests held back for the next window so other work is never starved
+RATE_LIMIT_RESERVE = int(os.getenv("RATE_LIMIT_RESERVE", "100"))
+
+
+class RateLimiter:
+    """Token bucket whose refill rate spreads the remaining budget to the reset
+
+    The budget comes from the X-RateLimit-* headers of each response. Until
+    the first response arrives the documented 5,000 requests per hour is
+    assumed. Retry-After and exhausted-budget responses block all requests
+    for the installation until GitHub says to resume.
+    """
+
+    def __init__(
+        self,
+        limit: int = 5000,
+        window: float = 3600,
+        burst: int = RATE_LIMIT_BURST,
+        reserve: int = RATE_LIMIT_RESERVE,
+        installation: Optional[int] = None,
+    ):
+        self.installation = installation
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = time.time() + window
+        self.burst = burst
+        self.reserve = reserve
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self._tokens = float(burst)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill_rate(self, now: float) -> float:
+        spendable = max(self.remaining - self.reserve, 0)
+        return spendable / max(self.reset_at - now, 1.0)
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait for it"""
+        with self._lock:
+            now = time.time()
+            if now >= self.reset_at:
+                # New window; assume the full budget until headers say otherwise
+                self.remaining = self.limit
+                self.reset_at = now + 3600
+
+            rate = self._refill_rate(now)
+            self._tokens = min(
+                self._tokens + (now - self._updated) * rate, float(self.burst)
+            )
+            self._updated = now
+
+            # Tokens may go negative; each caller queues behind earlier ones
+            self._tokens -= 1
+            self.remaining = max(self.remaining - 1, 0)
+            self.requests += 1
+
+            if self._tokens >= 0:
+                delay = 0.0
+            elif rate > 0:
+                delay = -self._tokens / rate
+            else:
+                delay = self.reset_at - now
+
+            return max(delay, self.blocked_until - now, 0.0)
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay <= 0:
+            return
+
+        with self._lock:
+            self.waits += 1
+            self.waited_seconds += delay
+        if delay >= 1:
+            print(f"⏳ Pacing GitHub requests - waiting {delay:.1f}s for rate limit")
+        time.sleep(delay)
+
+    def observe(self, status: int, headers: Dict[str, str]) -> None:
+        """Update the budget from a response's headers"""
+        # Search and GraphQL have their own budgets
+        if headers.get("x-ratelimit-resource", "core") != "core":
+            return
+
+        with self._lock:
+            now = time.time()
+            try:
+                if "x-ratelimit-remaining" in headers:
+                    self.remaining = int(float(headers["x-ratelimit-remaining"]))
+                if "x-ratelimit-limit" in headers:
+                    self.limit = int(float(headers["x-ratelimit-limit"]))
+                if "x-ratelimit-reset" in headers:
+                    self.reset_at = float(headers["x-ratelimit-reset"])
+            except ValueError:
+                pass
+            if self.installation is not None and "x-ratelimit-remaining" in headers:
+                GITHUB_RATE_LIMIT_REMAINING.labels(str(self.installation)).set(
+                    self.remaining
+                )
+
+            if "retry-after" in headers:
+                try:
+                    retry_after = float(headers["retry-after"])
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+                except ValueError:
+                    pass
+            elif status in (403, 429) and self.remaining == 0:
+                self.blocked_until = max(self.blocked_until, self.reset_at)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+                "blocked_until": self.blocked_until,
+                "requests": self.requests,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 3),
+            }
+
+
+_limiters: Dict[int, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(installation_id: int) -> RateLimiter:
+    """The limiter shared by every client of an installation"""
+    with _limiters_lock:
+        limiter = _limiters.get(int(installation_id))
+        if limiter is None:
+            limiter = _limiters[int(installation_id)] = RateLimiter(
+                installation=int(installation_id)
+            )
+        return limiter
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, float]]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {str(key): limiter.stats() for key, limiter in limiters.items()}
+
+
+class _RateLimitedConnection:
+    def __init__(self, *args, limiter: RateLimiter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def getresponse(self):
+        started = time.perf_counter()
+        with span("github", method=self.verb, url=self.url) as current:
+            self.limiter.acquire()
+            response = super().getresponse()
+            current.set_attribute("status", response.status)
+        self.limiter.observe(
+            response.status, {k.lower(): v for k, v in response.getheaders()}
+        )
+
+        endpoint = github_endpoint(self.url)
+        GITHUB_REQUEST_SECONDS.labels(self.verb, endpoint).observe(
+            time.perf_counter() - started
+        )
+        GITHUB_REQUESTS.labels(self.verb, endpoint, str(response.status)).inc()
+        BYTES_FETCHED.labels("github_api").inc(len(response.text or ""))
+        return response
+
+
+class RateLimitedHTTPSConnection(_RateLimitedConnection, HTTPSRequestsConnectionClass):
+    pass
+
+
+class RateLimitedHTTPConnection(_RateLimitedConnection, HTTPRequestsConnectionClass):
+    pass
+
+
+def install_rate_limiter(client, limiter: RateLimiter) -> None:
+    """Route every request a PyGithub client makes through the limiter
+
+    PyGithub has no public hook for this, so the connection class is swapped
+    on the client's own requester. injectConnectionClasses is avoided because
+    it turns off connection reuse for every client in the process.
+    """
+    requester = client._Github__requester
+    connection_class = requester._Requester__connectionClass
+    if issubclass(connection_class, HTTPSRequestsConnectionClass):
+        base = RateLimitedHTTPSConnection
+    else:
+        base = RateLimitedHTTPConnection
+
+    requester._Requester__connectionClass = lambda *args, **kwargs: base(
+        *args, limiter=limiter, **kwargs
+    )
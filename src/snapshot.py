@@ -0,0 +1,69 @@
+"""
+Repository snapshot ingestion from the GitHub tarball endpoint
+"""
+
+import tarfile
+from typing import Callable, Dict, Iterator, Tuple
+
+from src.file_filter import MAX_FILE_SIZE, looks_binary
+from src.http_clients import get_http_session
+from src.metrics import BYTES_FETCHED
+
+
+def iter_snapshot_files(
+    repo, ref: str, include: Callable[[str], bool], max_file_size: int = MAX_FILE_SIZE
+) -> Iterator[Tuple[str, bytes]]:
+    """Stream (path, bytes) for matching files in the repository tarball at ref
+
+    The archive is read straight off the HTTP response, so nothing is
+    extracted to disk and only one matching file is held in memory at a time.
+    """
+    # Resolves to a short-lived codeload URL that already carries the credentials
+    archive_url = repo.get_archive_link("tarball", ref=ref)
+
+    with get_http_session().get(archive_url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+
+        try:
+            with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+
+                    # Entries are prefixed with "<owner>-<repo>-<sha>/"
+                    _, _, path = member.name.partition("/")
+                    if not path or not include(path):
+                        continue
+
+                    if member.size > max_file_size:
+                        print(f"⏭️  Skipping {path} - too large ({member.size} bytes)")
+                        continue
+
+                    file_obj = archive.extractfile(member)
+                    if file_obj is not None:
+                        yield path, file_obj.read()
+        finally:
+            # Compressed bytes taken off the wire, even if reading stopped early
+            BYTES_FETCHED.labels("snapshot").inc(response.raw.tell())
+
+
+def iter_snapshot_text(
+    repo, ref: str, include: Callable[[str], bool], max_file_size: int = MAX_FILE_SIZE
+) -> Iterator[Tuple[str, str]]:
+    """Stream (path, text) for matching UTF-8 files, in archive order"""
+    for file_path, data in iter_snapshot_files(repo, ref, include, max_file_size):
+        if looks_binary(data):
+            print(f"⏭️  Skipping {file_path} - binary")
+            continue
+        try:
+            yield file_path, data.decode("utf-8")
+        except UnicodeDecodeError:
+            print(f"⏭️  Skipping {file_path} - not UTF-8 text")
+
+
+def read_snapshot_files(
+    repo, ref: str, include: Callable[[str], bool], max_file_size: int = MAX_FILE_SIZE
+) -> Dict[str, str]:
+    """Collect decoded text for matching files with a single archive download"""
+    return dict(iter_snapshot_text(repo, ref, include, max_file_size))
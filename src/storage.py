@@ -0,0 +1,12 @@
+"""
+Location of persistent IntelliDocs state on local disk
+"""
+
+import os
+
+
+def data_path(filename: str) -> str:
+    """Path of a state file inside the IntelliDocs data directory"""
+    data_dir = os.getenv("INTELLIDOCS_DATA_DIR", ".intellidocs")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, filename)
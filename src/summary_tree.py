@@ -0,0 +1,168 @@
+"""
+File and module summaries for hierarchical (map-reduce) documentation
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Set
+
+from src.prompt_builder import PRIORITY_SYMBOLS, PromptBuilder
+from src.tracing import in_current_context, span
+from src.tree_index import git_blob_sha
+
+# Bump when the summary prompts change so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "1"
+
+
+class SummaryTree:
+    """Summaries of every file, then of every module built from those
+
+    File summaries are keyed by blob SHA in the response cache, so a push
+    only summarises the files it touched. Module summaries read nothing but
+    file summaries, and top-level pages nothing but module summaries, which
+    keeps every prompt bounded however large the repository is.
+    """
+
+    def __init__(self, generator, code, modules: Dict[str, List[str]]):
+        self.generator = generator
+        self.code = code
+        self.modules = modules
+        self._files: Dict[str, str] = {}
+        self._modules: Dict[str, str] = {}
+        # Summaries that are symbol listings because the model call failed
+        self._fallback_files: Set[str] = set()
+        self._fallback_modules: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def prepare(self, file_paths: Iterable[str], module_names: Iterable[str]) -> None:
+        """Compute the given summaries in parallel, files before modules"""
+        module_names = list(module_names)
+        needed_files = set(file_paths)
+        for module_name in module_names:
+            needed_files.update(self.modules.get(module_name, []))
+        needed_files &= set(self.code.files)
+
+        workers = max(self.generator.max_concurrency, 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(
+                executor.map(
+                    in_current_context(self.file_summary), sorted(needed_files)
+                )
+            )
+            list(executor.map(in_current_context(self.module_summary), module_names))
+
+        print(
+            f"🌳 Summaries ready: {len(self._files)} files, {len(self._modules)} modules"
+        )
+
+    def file_summary(self, file_path: str) -> str:
+        with self._lock:
+            if file_path in self._files:
+                if file_path in self._fallback_files:
+                    self.generator._mark_fallback()
+                return self._files[file_path]
+
+        blob_sha = git_blob_sha(self.code.files[file_path].encode("utf-8"))
+        cache_key = None
+        if self.generator.cache is not None:
+            cache_key = self.generator.cache.key_for(
+                self.generator.model_name,
+                f"file-summary:{SUMMARY_PROMPT_VERSION}:{file_path}:{blob_sha}",
+            )
+
+        header = f"""
+        Summarize this source file for engineers new to the codebase in at most
+        150 words: its purpose, its main classes and functions, and how the rest
+        of the project uses it. Reply with plain markdown prose.
+
+        File: {file_path}
+        """
+        prompt = self.generator._pack_prompt(
+            file_path, header, self.code, [file_path], []
+        )
+
+        try:
+            with span("file_summary", file=file_path):
+                summary = self.generator._generate(
+                    prompt, f"summary:{file_path}", cache_key=cache_key
+                )
+        except Exception as e:
+            print(f"⚠️  File summary failed for {file_path}: {e}")
+            summary = self.code.symbols[file_path].summary()
+            with self._lock:
+                self._fallback_files.add(file_path)
+            self.generator._mark_fallback()
+
+        with self._lock:
+            self._files[file_path] = summary
+        return summary
+
+    def module_summary(self, module_name: str) -> str:
+        with self._lock:
+            if module_name in self._modules:
+                if module_name in self._fallback_modules:
+                    self.generator._mark_fallback()
+                return self._modules[module_name]
+
+        files = [
+            path
+            for path in self.modules.get(module_name, [])
+            if path in self.code.files
+        ]
+        header = f"""
+        Summarize the '{module_name}' module in at most 250 words from the
+        summaries of its files below: what it is responsible for, its key
+        components and how they fit together. Reply with plain markdown prose.
+        """
+        prompt = self.file_context(self.generator.prompt_budget, header, files)
+        # Built on a fallback file summary, it needs redoing as well
+        fell_back = any(path in self._fallback_files for path in files)
+
+        try:
+            with span("module_summary", module=module_name):
+                summary = self.generator._generate(
+                    prompt, f"summary:module:{module_name}"
+                )
+        except Exception as e:
+            print(f"⚠️  Module summary failed for {module_name}: {e}")
+            summary = "\n".join(self.code.symbols[path].summary() for path in files)
+            fell_back = True
+
+        with self._lock:
+            self._modules[module_name] = summary
+            if fell_back:
+                self._fallback_modules.add(module_name)
+        if fell_back:
+            self.generator._mark_fallback()
+        return summary
+
+    def file_context(
+        self,
+        budget_tokens: int,
+        header: str,
+        file_paths: List[str],
+        details: Iterable[str] = (),
+    ) -> str:
+        """A prompt of the given files' summaries, then details, under the header"""
+        builder = PromptBuilder(budget_tokens, header)
+        for file_path in file_paths:
+            builder.add(
+                f"--- {file_path} ---\n{self.file_summary(file_path)}", PRIORITY_SYMBOLS
+            )
+        for detail in details:
+            builder.add(detail, PRIORITY_SYMBOLS)
+        return builder.build()
+
+    def module_context(
+        self, budget_tokens: int, header: str, details: Iterable[str] = ()
+    ) -> str:
+        """A prompt of every module's summary, then details, under the header"""
+        builder = PromptBuilder(budget_tokens, header)
+        for module_name in self.modules:
+            builder.add(
+                f"--- {module_name} ---\n{self.module_summary(module_name)}",
+                PRIORITY_SYMBOLS,
+            )
+        for detail in details:
+            builder.add(detail, PRIORITY_SYMBOLS)
+        return builder.build()
@@ -0,0 +1,374 @@
+"""
+Compact per-file index of classes, functions, imports and docstrings
+"""
+
+import ast
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+
+
+@dataclass
+class Symbol:
+    kind: str  # class, function, method, type or table
+    name: str
+    signature: str
+    line: int
+    doc: str = ""
+    parent: Optional[str] = None
+
+
+@dataclass
+class FileSymbols:
+    path: str
+    language: str
+    lines: int
+    doc: str = ""
+    imports: List[str] = field(default_factory=list)
+    symbols: List[Symbol] = field(default_factory=list)
+
+    def names(self, *kinds: str) -> List[str]:
+        return [symbol.name for symbol in self.symbols if symbol.kind in kinds]
+
+    def summary(self, max_symbols: int = 40) -> str:
+        """A few lines describing the file, small enough to put in a prompt"""
+        parts = [f"{self.path} ({self.language}, {self.lines} lines)"]
+        if self.doc:
+            parts.append(f"  doc: {self.doc}")
+        if self.imports:
+            imports = ", ".join(self.imports[:15])
+            more = f" (+{len(self.imports) - 15})" if len(self.imports) > 15 else ""
+            parts.append(f"  imports: {imports}{more}")
+
+        for symbol in self.symbols[:max_symbols]:
+            indent = "    " if symbol.parent else "  "
+            line = f"{indent}{symbol.signature}"
+            if symbol.doc:
+                line += f"  # {symbol.doc}"
+            parts.append(line)
+        if len(self.symbols) > max_symbols:
+            parts.append(f"  ... {len(self.symbols) - max_symbols} more symbols")
+
+        return "\n".join(parts)
+
+
+def _first_line(docstring: Optional[str]) -> str:
+    if not docstring:
+        return ""
+    return docstring.strip().split("\n")[0].strip()[:120]
+
+
+def _python_signature(node) -> str:
+    prefix = "async def " if isinstance(node, ast.AsyncFunctionDef) else "def "
+    signature = f"{prefix}{node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    decorators = " ".join(f"@{ast.unparse(d)}" for d in node.decorator_list)
+    return f"{decorators} {signature}" if decorators else signature
+
+
+def _extract_python(path: str, content: str) -> FileSymbols:
+    tree = ast.parse(content)
+    result = FileSymbols(
+        path, "Python", content.count("\n") + 1, _first_line(ast.get_docstring(tree))
+    )
+
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            result.imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            result.imports.append("." * node.level + (node.module or ""))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            result.symbols.append(
+                Symbol(
+                    "function",
+                    node.name,
+                    _python_signature(node),
+                    node.lineno,
+                    _first_line(ast.get_docstring(node)),
+                )
+            )
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            result.symbols.append(
+                Symbol(
+                    "class",
+                    node.name,
+                    f"class {node.name}({bases})" if bases else f"class {node.name}",
+                    node.lineno,
+                    _first_line(ast.get_docstring(node)),
+                )
+            )
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    result.symbols.append(
+                        Symbol(
+                            "method",
+                            child.name,
+                            _python_signature(child),
+                            child.lineno,
+                            _first_line(ast.get_docstring(child)),
+                            parent=node.name,
+                        )
+                    )
+
+    return result
+
+
+# Per language: file extensions, then (kind, pattern) pairs tried on each line.
+# Each pattern's "name" group is the symbol name and the whole match, trimmed,
+# is its signature. "import" patterns capture the imported module instead.
+_C_FAMILY_CONTROL = r"(?!(?:if|for|while|switch|catch|return|else|new|sizeof)\b)"
+
+LANGUAGES: Dict[str, Tuple[Tuple[str, ...], List[Tuple[str, str]]]] = {
+    "JavaScript/TypeScript": (
+        (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"),
+        [
+            ("import", r"^\s*import\s.*?from\s+['\"](?P<name>[^'\"]+)['\"]"),
+            ("import", r"require\(\s*['\"](?P<name>[^'\"]+)['\"]\s*\)"),
+            (
+                "class",
+                r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?"
+                r"(?:class|interface|enum)\s+(?P<name>\w+)",
+            ),
+            ("type", r"^\s*(?:export\s+)?type\s+(?P<name>\w+)\s*(?:<[^=]*>)?\s*="),
+            (
+                "function",
+                r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*"
+                r"(?P<name>\w+)\s*(?:<[^(]*>)?\([^)]*\)",
+            ),
+            (
+                "function",
+                r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>\w+)\s*"
+                r"(?::[^=]+)?=\s*(?:async\s+)?(?:\([^)]*\)|\w+)\s*(?::[^=]+)?=>",
+            ),
+            (
+                "method",
+                r"^\s+(?:(?:public|private|protected|static|async|get|set|readonly)\s+)*"
+                + _C_FAMILY_CONTROL
+                + r"(?P<name>\w+)\s*\([^)]*\)\s*(?::[^{]+)?\{",
+            ),
+        ],
+    ),
+    "Java/Kotlin/Scala/C#": (
+        (".java", ".kt", ".kts", ".scala", ".cs"),
+        [
+            ("import", r"^\s*(?:import|using)\s+(?:static\s+)?(?P<name>[\w.]+)"),
+            (
+                "class",
+                r"^\s*(?:[\w@]+\s+)*(?:class|interface|enum|record|object|trait)\s+"
+                r"(?P<name>\w+)",
+            ),
+            (
+                "function",
+                r"^\s*(?:[\w@]+\s+)*(?:fun|def)\s+(?:<[^>]*>\s*)?(?P<name>\w+)",
+            ),
+            (
+                "method",
+                r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|"
+                r"synchronized|override|virtual|async)\s+)+[\w<>\[\],.?\s]*?"
+                + _C_FAMILY_CONTROL
+                + r"(?P<name>\w+)\s*\([^)]*\)",
+            ),
+        ],
+    ),
+    "Go": (
+        (".go",),
+        [
+            ("import", r"^\s*(?:import\s+)?(?:\w+\s+)?\"(?P<name>[\w./-]+)\"\s*$"),
+            ("type", r"^type\s+(?P<name>\w+)\s+(?:struct|interface)"),
+            ("method", r"^func\s+\([^)]*\)\s*(?P<name>\w+)\s*\([^)]*\)"),
+            ("function", r"^func\s+(?P<name>\w+)\s*(?:\[[^\]]*\])?\([^)]*\)"),
+        ],
+    ),
+    "Rust": (
+        (".rs",),
+        [
+            ("import", r"^\s*use\s+(?P<name>[\w:]+)"),
+            (
+                "type",
+                r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|union)\s+(?P<name>\w+)",
+            ),
+            ("class", r"^\s*impl(?:<[^>]*>)?\s+(?:[\w:<>]+\s+for\s+)?(?P<name>\w+)"),
+            (
+                "function",
+                r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?"
+                r"fn\s+(?P<name>\w+)\s*(?:<[^(]*>)?\([^)]*\)?",
+            ),
+        ],
+    ),
+    "C/C++": (
+        (".c", ".h", ".cpp", ".cc", ".cxx", ".hpp", ".hh"),
+        [
+            ("import", r"^\s*#\s*include\s+[<\"](?P<name>[^>\"]+)[>\"]"),
+            (
+                "class",
+                r"^\s*(?:template\s*<[^>]*>\s*)?(?:class|struct)\s+(?P<name>\w+)\s*[:{]",
+            ),
+            (
+                "function",
+                r"^(?:[\w:*&<>,]+\s+)+[*&]*"
+                + _C_FAMILY_CONTROL
+                + r"(?P<name>[\w:~]+)\s*\([^;]*\)\s*(?:const\s*)?\{?\s*$",
+            ),
+        ],
+    ),
+    "PHP": (
+        (".php",),
+        [
+            (
+                "import",
+                r"^\s*(?:use|require_once|include_once)\s+['\"]?(?P<name>[\w\\/.]+)",
+            ),
+            (
+                "class",
+                r"^\s*(?:abstract\s+|final\s+)?(?:class|interface|trait)\s+(?P<name>\w+)",
+            ),
+            (
+                "function",
+                r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*"
+                r"function\s+&?(?P<name>\w+)\s*\([^)]*\)",
+            ),
+        ],
+    ),
+    "Ruby": (
+        (".rb",),
+        [
+            ("import", r"^\s*require(?:_relative)?\s+['\"](?P<name>[^'\"]+)['\"]"),
+            ("class", r"^\s*(?:class|module)\s+(?P<name>[\w:]+)"),
+            ("function", r"^\s*def\s+(?:self\.)?(?P<name>\w+[?!=]?)(?:\s*\([^)]*\))?"),
+        ],
+    ),
+    "Swift": (
+        (".swift",),
+        [
+            ("import", r"^\s*import\s+(?P<name>\w+)"),
+            (
+                "class",
+                r"^\s*(?:(?:public|private|internal|open|final)\s+)*"
+                r"(?:class|struct|protocol|enum|extension|actor)\s+(?P<name>\w+)",
+            ),
+            (
+                "function",
+                r"^\s*(?:(?:public|private|internal|open|static|override|mutating)\s+)*"
+                r"func\s+(?P<name>\w+)\s*(?:<[^(]*>)?\([^)]*\)",
+            ),
+        ],
+    ),
+    "Shell": (
+        (".sh", ".bash"),
+        [
+            ("import", r"^\s*(?:source|\.)\s+(?P<name>\S+)"),
+            ("function", r"^\s*function\s+(?P<name>[\w-]+)"),
+            ("function", r"^\s*(?P<name>[\w-]+)\s*\(\)"),
+        ],
+    ),
+    "SQL": (
+        (".sql",),
+        [
+            (
+                "table",
+                r"(?i)^\s*create\s+(?:or\s+replace\s+)?(?:table|view|index)\s+"
+                r"(?:if\s+not\s+exists\s+)?(?P<name>[\w.\"`]+)",
+            ),
+            (
+                "function",
+                r"(?i)^\s*create\s+(?:or\s+replace\s+)?(?:function|procedure)\s+"
+                r"(?P<name>[\w.\"`]+)",
+            ),
+        ],
+    ),
+    "YAML": (
+        (".yaml", ".yml"),
+        [("type", r"^(?P<name>[\w.-]+):")],
+    ),
+}
+
+_COMPILED: Dict[str, Tuple[str, List[Tuple[str, Pattern]]]] = {}
+for _language, (_extensions, _patterns) in LANGUAGES.items():
+    _compiled = [(kind, re.compile(pattern)) for kind, pattern in _patterns]
+    for _extension in _extensions:
+        _COMPILED[_extension] = (_language, _compiled)
+
+_COMMENT_PREFIXES = ("//", "#", "*", "/*", "--")
+
+_PYTHON_FALLBACK = [
+    ("import", re.compile(r"^\s*(?:from|import)\s+(?P<name>[.\w]+)")),
+    ("class", re.compile(r"^\s*class\s+(?P<name>\w+)[^:]*")),
+    ("function", re.compile(r"^\s*(?:async\s+)?def\s+(?P<name>\w+)\s*\([^)]*\)?")),
+]
+
+
+def _extract_with_patterns(
+    path: str, content: str, language: str, patterns: List[Tuple[str, Pattern]]
+) -> FileSymbols:
+    result = FileSymbols(path, language, content.count("\n") + 1)
+    current_class = None
+
+    for number, line in enumerate(content.split("\n"), 1):
+        stripped = line.lstrip()
+        # "#include" and "#!" are not comments for our purposes
+        if not stripped or (
+            stripped.startswith(_COMMENT_PREFIXES)
+            and not stripped.startswith(("#include", "# include"))
+        ):
+            continue
+
+        for kind, pattern in patterns:
+            match = pattern.search(line)
+            if not match:
+                continue
+
+            name = match.group("name")
+            if kind == "import":
+                result.imports.append(name)
+                break
+
+            if kind in ("class", "type") and not line[:1].isspace():
+                current_class = name
+            elif kind in ("function", "method") and not line[:1].isspace():
+                current_class = None
+
+            parent = current_class if line[:1].isspace() else None
+            if kind == "function" and parent:
+                kind = "method"
+            if kind == "method" and not parent and language != "Go":
+                kind = "function"
+
+            signature = match.group(0).strip().rstrip("{").strip()
+            result.symbols.append(
+                Symbol(kind, name, signature[:160], number, "", parent)
+            )
+            break
+
+    return result
+
+
+def extract_symbols(path: str, content: str) -> FileSymbols:
+    """Symbol index for one file; unknown file types get only a line count"""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".py":
+        try:
+            return _extract_python(path, content)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            # Not valid for this interpreter, or nested too deeply for ast to
+            # parse; the line scanner still gets close
+            return _extract_with_patterns(path, content, "Python", _PYTHON_FALLBACK)
+
+    if extension in _COMPILED:
+        language, patterns = _COMPILED[extension]
+        return _extract_with_patterns(path, content, language, patterns)
+
+    return FileSymbols(
+        path, extension.lstrip(".").upper() or "text", content.count("\n") + 1
+    )
+
+
+def build_symbol_index(code_files: Dict[str, str]) -> Dict[str, FileSymbols]:
+    """Symbol index for every file, in path order"""
+    return {
+        file_path: extract_symbols(file_path, code_files[file_path])
+        for file_path in sorted(code_files)
+    }
@@ -0,0 +1,221 @@
+"""
+Lightweight per-push tracing: nested spans written as JSON lines
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.storage import data_path
+
+# "off", "jsonl" (one span per line) or "otlp" (OTLP/JSON, one trace per line)
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "off").lower()
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "intellidocs_span", default=None
+)
+
+
+class _Trace:
+    """Spans of one trace, buffered until its root span ends"""
+
+    def __init__(self, tags: Dict[str, Any]):
+        self.trace_id = os.urandom(16).hex()
+        self.tags = tags
+        self.spans: List["Span"] = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    """A timed operation inside a trace; use as a context manager"""
+
+    def __init__(
+        self,
+        name: str,
+        attributes: Dict[str, Any],
+        parent: Optional["Span"],
+        tags: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace = parent.trace if parent else _Trace(tags or {})
+        self.span_id = os.urandom(8).hex()
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+
+        with self.trace.lock:
+            self.trace.spans.append(self)
+        if self.parent is None:
+            _exporter.export(self.trace)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "tags": self.trace.tags,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for every span while tracing is off"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    attributes = {**span.trace.tags, **span.attributes}
+    otlp = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in attributes.items()
+            if value is not None
+        ],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent:
+        otlp["parentSpanId"] = span.parent.span_id
+    return otlp
+
+
+class _Exporter:
+    """Appends finished traces to TRACE_PATH in the configured format"""
+
+    def __init__(self, format: str, path: Optional[str]):
+        self.format = format
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: _Trace) -> None:
+        with trace.lock:
+            spans = sorted(trace.spans, key=lambda span: span.start_ns)
+
+        if self.format == "otlp":
+            lines = [
+                json.dumps(
+                    {
+                        "resourceSpans": [
+                            {
+                                "resource": {
+                                    "attributes": [
+                                        {
+                                            "key": "service.name",
+                                            "value": {"stringValue": "intellidocs"},
+                                        }
+                                    ]
+                                },
+                                "scopeSpans": [
+                                    {
+                                        "scope": {"name": "intellidocs"},
+                                        "spans": [_otlp_span(span) for span in spans],
+                                    }
+                                ],
+                            }
+                        ]
+                    },
+                    default=str,
+                )
+            ]
+        else:
+            lines = [json.dumps(span.to_dict(), default=str) for span in spans]
+
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._file = open(
+                        self.path or data_path("traces.jsonl"), "a", encoding="utf-8"
+                    )
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+        except OSError as e:
+            print(f"⚠️  Could not write trace: {e}")
+
+
+_exporter = _Exporter(
+    TRACE_EXPORT if TRACE_EXPORT in ("jsonl", "otlp") else "off",
+    os.getenv("TRACE_PATH"),
+)
+
+
+def start_trace(name: str, **tags: Any):
+    """Root span of a new trace; tags are recorded with every span in it"""
+    if _exporter.format == "off":
+        return _NOOP_SPAN
+    return Span(name, {}, None, tags)
+
+
+def span(name: str, **attributes: Any):
+    """Child of the current span, or a trace of its own outside of one"""
+    if _exporter.format == "off":
+        return _NOOP_SPAN
+    return Span(name, attributes, _current_span.get())
+
+
+def in_current_context(function: Callable) -> Callable:
+    """Wrap function so worker threads record spans under the caller's span
+
+    ThreadPoolExecutor does not carry context variables into its threads.
+    Every call runs in its own copy, since one context cannot be entered by
+    two threads at once.
+    """
+    if _exporter.format == "off":
+        return function
+
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)
+
+    return run
@@ -0,0 +1,81 @@
+"""
+Repository file listing using the recursive Git Trees API
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+def git_blob_sha(content: bytes) -> str:
+    """The SHA git assigns to a blob with this content"""
+    digest = hashlib.sha1(b"blob %d\0" % len(content))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class TreeEntry:
+    path: str
+    mode: str
+    size: int
+    sha: str
+
+
+class TreeIndex:
+    """Every blob in a tree, listed with one request when GitHub allows it"""
+
+    def __init__(self, entries: Dict[str, TreeEntry], requests_made: int = 1):
+        self.entries = entries
+        self.requests_made = requests_made
+
+    @classmethod
+    def fetch(cls, repo, tree_ish: str) -> "TreeIndex":
+        """List a commit SHA, tree SHA or branch name recursively"""
+        index = cls({}, requests_made=0)
+        index._collect(repo, tree_ish, "")
+        return index
+
+    def _collect(self, repo, tree_sha: str, prefix: str) -> None:
+        tree = repo.get_git_tree(tree_sha, recursive=True)
+        self.requests_made += 1
+
+        if not tree.raw_data.get("truncated"):
+            for element in tree.tree:
+                self._add(prefix, element)
+            return
+
+        # The recursive listing hit GitHub's size cap, so list this level
+        # and descend into each subtree separately
+        print(f"⚠️  Tree listing for '{prefix or '/'}' truncated - listing subtrees")
+        top_level = repo.get_git_tree(tree_sha)
+        self.requests_made += 1
+        for element in top_level.tree:
+            if element.type == "tree":
+                self._collect(repo, element.sha, f"{prefix}{element.path}/")
+            else:
+                self._add(prefix, element)
+
+    def _add(self, prefix: str, element) -> None:
+        # Submodules (type "commit") have no content in this repository
+        if element.type != "blob":
+            return
+        path = f"{prefix}{element.path}"
+        self.entries[path] = TreeEntry(
+            path=path, mode=element.mode, size=element.size or 0, sha=element.sha
+        )
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, path: str) -> Optional[TreeEntry]:
+        return self.entries.get(path)
+
+    def paths(self, include: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """Paths of all blobs, optionally filtered"""
+        if include is None:
+            return list(self.entries)
+        return [path for path in self.entries if include(path)]
@@ -1,13 +1,16 @@
 import os
 from github import GithubException
-from src.auth import GitHubAppAuth
+from src.auth import get_github_auth
 from src.git_operations import GitOperations
 from src.docs_generator import DocsGenerator
+from src.file_filter import fetch_file_filter, looks_binary
+from src.snapshot import read_snapshot_files
+from src.tree_index import TreeIndex
 
 
 class WebhookHandler:
     def __init__(self):
-        self.auth = GitHubAppAuth()
+        self.auth = get_github_auth()
         self.git_ops = GitOperations()
         self.docs_gen = DocsGenerator()
 
@@ -123,32 +126,19 @@ class WebhookHandler:
     async def get_changed_files(self, repo_client, before_sha, after_sha):
         try:
             comparison = repo_client.compare(before_sha, after_sha)
+            file_filter = fetch_file_filter(repo_client, after_sha)
             changed_files = []
 
-            code_extensions = {
-                ".py",
-                ".js",
-                ".ts",
-                ".java",
-                ".cpp",
-                ".c",
-                ".go",
-                ".rs",
-                ".rb",
-                ".php",
-            }
-
             for file in comparison.files:
                 if file.status in ["added", "modified"]:
-                    file_ext = os.path.splitext(file.filename)[1]
-                    if file_ext in code_extensions:
+                    if file_filter(file.filename):
+                        data = repo_client.get_contents(
+                            file.filename, ref=after_sha
+                        ).decoded_content
+                        if len(data) > file_filter.max_file_size or looks_binary(data):
+                            continue
                         changed_files.append(
-                            {
-                                "filename": file.filename,
-                                "content": repo_client.get_contents(
-                                    file.filename, ref=after_sha
-                                ).decoded_content.decode("utf-8"),
-                            }
+                            {"filename": file.filename, "content": data.decode("utf-8")}
                         )
 
             return changed_files
@@ -159,52 +149,38 @@ class WebhookHandler:
 
     async def get_all_code_files(self, repo_client, commit_sha):
         """Get all code files in the repository"""
+        file_filter = fetch_file_filter(repo_client, commit_sha)
+        try:
+            snapshot = read_snapshot_files(
+                repo_client, commit_sha, file_filter, file_filter.max_file_size
+            )
+            return [
+                {"filename": path, "content": content}
+                for path, content in snapshot.items()
+            ]
+        except Exception as e:
+            print(f"⚠️  Snapshot download failed, walking contents instead: {e}")
+
         try:
             all_files = []
-            code_extensions = {
-                ".py",
-                ".js",
-                ".ts",
-                ".java",
-                ".cpp",
-                ".c",
-                ".go",
-                ".rs",
-                ".rb",
-                ".php",
-            }
-
-            def collect_files(contents, path_prefix=""):
-                for content in contents:
-                    if content.type == "file":
-                        file_ext = os.path.splitext(content.name)[1]
-                        if file_ext in code_extensions:
-                            try:
-                                file_content = repo_client.get_contents(
-                                    content.path, ref=commit_sha
-                                ).decoded_content.decode("utf-8")
-                                all_files.append(
-                                    {
-                                        "filename": content.path,
-                                        "content": file_content,
-                                    }
-                                )
-                                print(f"📖 Processing: {content.path}")
-                                print(f"✅ Collected content for: {content.path}")
-                            except Exception as e:
-                                print(f"⚠️  Could not read {content.path}: {e}")
-                    elif content.type == "dir" and not content.name.startswith("."):
-                        try:
-                            sub_contents = repo_client.get_contents(
-                                content.path, ref=commit_sha
-                            )
-                            collect_files(sub_contents, content.path + "/")
-                        except Exception as e:
-                            print(f"⚠️  Could not read directory {content.path}: {e}")
-
-            # Start from root
-            root_contents = repo_client.get_contents("", ref=commit_sha)
-            collect_files(root_contents)
+            index = TreeIndex.fetch(repo_client, commit_sha)
+
+            for entry in index.entries.values():
+                # Hidden directories are left out by the default excludes
+                if not file_filter.allows(entry.path, entry.size):
+                    continue
+                path = entry.path
+                try:
+                    data = repo_client.get_contents(
+                        path, ref=commit_sha
+                    ).decoded_content
+                    if looks_binary(data):
+                        continue
+                    file_content = data.decode("utf-8")
+                    all_files.append({"filename": path, "content": file_content})
+                    print(f"✅ Collected content for: {path}")
+                except Exception as e:
+                    print(f"⚠️  Could not read {path}: {e}")
 
             return all_files
 